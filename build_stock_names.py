@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+生成完整 A 股名称表 stock_names.pkl.zst
+
+从 Tushare 拉取全部上市股票的 {代码: 名称}，pickle 后用 zstd 压缩，
+写到 analyzer.py 同目录，供 analyzer.STOCK_NAME_MAP 首次访问时加载。
+需要配置 TUSHARE_TOKEN 并安装 zstandard；名称有变动时重新运行即可。
+
+用法：
+    python build_stock_names.py
+"""
+
+import logging
+import pickle
+import sys
+
+import zstandard
+
+from analyzer import _STOCK_NAMES_FILE
+from data_provider.tushare_fetcher import TushareFetcher
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(message)s')
+
+    names = TushareFetcher().get_all_stock_names()
+    if not names:
+        logger.error("未获取到股票名称，请检查 TUSHARE_TOKEN 配置")
+        return 1
+
+    data = zstandard.compress(pickle.dumps(names, protocol=pickle.HIGHEST_PROTOCOL))
+    _STOCK_NAMES_FILE.write_bytes(data)
+    logger.info(f"已写入 {_STOCK_NAMES_FILE}：{len(names)} 只股票，{len(data)} 字节")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,6 +22,8 @@
 """
 
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Any, Tuple
 from enum import Enum
@@ -29,6 +31,8 @@ from enum import Enum
 import pandas as pd
 import numpy as np
 
+import chan_kernel
+
 logger = logging.getLogger(__name__)
 
 
@@ -76,7 +80,16 @@ class BuySellPoint(Enum):
     NONE = "无买卖点"
 
 
-@dataclass
+# 热路径上比较/构造用的枚举成员别名：按 is 比较，且省去每次经 Enum 类的属性查找
+_TOP = FenXingType.TOP
+_BOTTOM = FenXingType.BOTTOM
+_UP = BiDirection.UP
+_DOWN = BiDirection.DOWN
+_BUY_POINTS = (BuySellPoint.BUY_1, BuySellPoint.BUY_2, BuySellPoint.BUY_3)
+_SELL_POINTS = (BuySellPoint.SELL_1, BuySellPoint.SELL_2, BuySellPoint.SELL_3)
+
+
+@dataclass(slots=True)
 class FenXing:
     """分型数据类"""
     index: int              # 在DataFrame中的索引
@@ -84,31 +97,21 @@ class FenXing:
     high: float             # 分型高点（顶分型取最高）
     low: float              # 分型低点（底分型取最低）
     date: str               # 日期
-    fx_value: float = 0.0   # 分型值（顶分型=high，底分型=low）
-    
-    def __post_init__(self):
-        if self.type == FenXingType.TOP:
-            self.fx_value = self.high
-        elif self.type == FenXingType.BOTTOM:
-            self.fx_value = self.low
+    fx_value: float = 0.0   # 分型值（顶分型=high，底分型=low，由构造方传入）
 
 
-@dataclass
+@dataclass(slots=True)
 class Bi:
     """笔数据类"""
     start_fx: FenXing       # 起始分型
     end_fx: FenXing         # 结束分型
     direction: BiDirection  # 笔方向
-    high: float = 0.0       # 笔的最高点
-    low: float = 0.0        # 笔的最低点
+    high: float = 0.0       # 笔的最高点（起止分型高点的较大者）
+    low: float = 0.0        # 笔的最低点（起止分型低点的较小者）
     power: float = 0.0      # 笔的力度（MACD面积）
-    
-    def __post_init__(self):
-        self.high = max(self.start_fx.high, self.end_fx.high)
-        self.low = min(self.start_fx.low, self.end_fx.low)
 
 
-@dataclass
+@dataclass(slots=True)
 class ZhongShu:
     """中枢数据类"""
     bis: List[Bi]           # 组成中枢的笔
@@ -129,32 +132,47 @@ class ZhongShu:
         return (self.zg + self.zd) / 2
 
 
-@dataclass
+@dataclass(slots=True)
 class XianDuan:
     """线段数据类"""
     bis: List[Bi]           # 组成线段的笔
     direction: XianDuanDirection  # 线段方向
-    high: float = 0.0       # 线段最高点
-    low: float = 0.0        # 线段最低点
-    
-    def __post_init__(self):
-        if self.bis:
-            self.high = max(bi.high for bi in self.bis)
-            self.low = min(bi.low for bi in self.bis)
+    high: float = 0.0       # 线段最高点（各笔高点的最大值）
+    low: float = 0.0        # 线段最低点（各笔低点的最小值）
+
+
+@dataclass(slots=True)
+class KLineArrays:
+    """逐K线中间结果（按位置排列的数组，供分型/笔等后续步骤使用）"""
+    high_p: np.ndarray      # 包含处理后的高点
+    low_p: np.ndarray       # 包含处理后的低点
+    macd_dif: np.ndarray    # MACD DIF
+    macd_dea: np.ndarray    # MACD DEA（信号线）
+    macd_bar: np.ndarray    # MACD 柱
+    dates: np.ndarray       # 日期（datetime64 列保持原数组，其他类型为 object 数组）
+    macd_bar_cumsum: np.ndarray  # MACD 柱前缀和（长度 N+1，NaN 按 0 计），区间和 = cumsum[end+1] - cumsum[start]
 
 
-@dataclass
+@dataclass(slots=True)
 class ChanAnalysisResult:
     """缠论分析结果"""
     code: str
     
     # === 分型信息 ===
     fenxings: List[FenXing] = field(default_factory=list)
+    fenxing_is_top: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.bool_))  # 与 fenxings 对齐的顶分型标记
+    fenxing_index: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))  # 与 fenxings 对齐的K线位置
+    fenxing_high: np.ndarray = field(default_factory=lambda: np.zeros(0))  # 与 fenxings 对齐的分型高点
+    fenxing_low: np.ndarray = field(default_factory=lambda: np.zeros(0))   # 与 fenxings 对齐的分型低点
     last_fenxing: Optional[FenXing] = None    # 最近的分型
     fenxing_summary: str = ""                  # 分型摘要
     
     # === 笔信息 ===
     bis: List[Bi] = field(default_factory=list)
+    bi_is_up: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.bool_))  # 与 bis 对齐的上升笔标记
+    bi_high: np.ndarray = field(default_factory=lambda: np.zeros(0))   # 与 bis 对齐的笔高点
+    bi_low: np.ndarray = field(default_factory=lambda: np.zeros(0))    # 与 bis 对齐的笔低点
+    bi_power: np.ndarray = field(default_factory=lambda: np.zeros(0))  # 与 bis 对齐的笔力度
     last_bi: Optional[Bi] = None              # 最近的笔
     bi_summary: str = ""                       # 笔摘要
     current_bi_direction: str = ""            # 当前笔方向
@@ -190,12 +208,19 @@ class ChanAnalysisResult:
     analysis_summary: str = ""                 # 综合分析摘要
     
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
+        """
+        转换为字典（key_levels 为浅拷贝，修改返回值不影响结果对象）
+        
+        枚举文本直接读成员上已保存的 _value_：.value 是描述符属性，
+        每次访问都要走一遍 Python 层的 getter
+        """
+        last_fenxing = self.last_fenxing
+        current_zhongshu = self.current_zhongshu
         return {
             'code': self.code,
             # 分型
             'fenxing_count': len(self.fenxings),
-            'last_fenxing': self.last_fenxing.type.value if self.last_fenxing else '无',
+            'last_fenxing': last_fenxing.type._value_ if last_fenxing else '无',
             'fenxing_summary': self.fenxing_summary,
             # 笔
             'bi_count': len(self.bis),
@@ -208,26 +233,31 @@ class ChanAnalysisResult:
             'zhongshu_count': len(self.zhongshus),
             'zhongshu_summary': self.zhongshu_summary,
             'price_position': self.price_position,
-            'current_zg': self.current_zhongshu.zg if self.current_zhongshu else 0,
-            'current_zd': self.current_zhongshu.zd if self.current_zhongshu else 0,
+            'current_zg': current_zhongshu.zg if current_zhongshu else 0,
+            'current_zd': current_zhongshu.zd if current_zhongshu else 0,
             # 背驰
-            'beichi_type': self.beichi_type.value,
+            'beichi_type': self.beichi_type._value_,
             'beichi_summary': self.beichi_summary,
             'macd_divergence': self.macd_divergence,
             # 买卖点
-            'buy_sell_point': self.buy_sell_point.value,
+            'buy_sell_point': self.buy_sell_point._value_,
             'buy_sell_reason': self.buy_sell_reason,
             # 趋势
-            'trend_type': self.trend_type.value,
+            'trend_type': self.trend_type._value_,
             'trend_summary': self.trend_summary,
             # 综合
             'chan_score': self.chan_score,
             'operation_suggestion': self.operation_suggestion,
-            'key_levels': self.key_levels,
+            'key_levels': dict(self.key_levels),
             'analysis_summary': self.analysis_summary,
         }
 
 
+# 笔数不足时背驰判断的结果，以及无买卖点时的结果（analyze 提前跳过对应步骤时直接使用）
+_BEICHI_TOO_FEW_BIS = (BeiChiType.NONE, "笔数不足，无法判断背驰", False)
+_NO_BUY_SELL_POINT = (BuySellPoint.NONE, "当前无明确买卖点")
+
+
 class ChanAnalyzer:
     """
     缠论分析器
@@ -273,46 +303,52 @@ class ChanAnalyzer:
         
         # 确保数据按日期排序
         df = df.sort_values('date').reset_index(drop=True)
+        current_price = float(df['close'].iat[-1])
         
-        # 1. K线包含处理（合并包含关系）
-        df_processed = self._process_include(df)
-        
-        # 2. 计算MACD（用于背驰判断）
-        df_processed = self._calculate_macd(df_processed)
-        
-        # 3. 识别分型
-        fenxings = self._identify_fenxing(df_processed)
+        # 1-3. K线包含处理、计算MACD（用于背驰判断）、识别分型（单次遍历完成）
+        bars, fenxings, fenxing_index, fenxing_is_top = self._prescan(df)
         result.fenxings = fenxings
+        result.fenxing_is_top = fenxing_is_top
+        result.fenxing_index = fenxing_index
+        result.fenxing_high = bars.high_p[fenxing_index]
+        result.fenxing_low = bars.low_p[fenxing_index]
         if fenxings:
             result.last_fenxing = fenxings[-1]
-            result.fenxing_summary = self._summarize_fenxings(fenxings)
+            result.fenxing_summary = self._summarize_fenxings(fenxings, fenxing_is_top)
+        
+        # 后续步骤按分型/笔的数量提前跳过：不足两个分型无法成笔，
+        # 线段和中枢至少需要3笔，背驰判断至少需要5笔
         
         # 4. 构建笔
-        bis = self._build_bi(fenxings, df_processed)
+        if len(fenxings) >= 2:
+            bis, result.bi_is_up, result.bi_high, result.bi_low, result.bi_power = self._build_bi(result, bars)
+        else:
+            bis = []
         result.bis = bis
         if bis:
             result.last_bi = bis[-1]
             result.current_bi_direction = bis[-1].direction.value
-            result.bi_summary = self._summarize_bis(bis)
+            result.bi_summary = self._summarize_bis(bis, result.bi_is_up)
         
         # 5. 识别线段
-        xianduans = self._build_xianduan(bis)
+        xianduans = self._build_xianduan(bis, result.bi_is_up, result.bi_high, result.bi_low) if len(bis) >= 3 else []
         result.xianduans = xianduans
         if xianduans:
             result.last_xianduan = xianduans[-1]
             result.xianduan_summary = self._summarize_xianduans(xianduans)
         
         # 6. 定位中枢
-        zhongshus = self._identify_zhongshu(bis)
+        zhongshus = self._identify_zhongshu(bis, result.bi_high, result.bi_low) if len(bis) >= 3 else []
         result.zhongshus = zhongshus
         if zhongshus:
             result.current_zhongshu = zhongshus[-1]
-            current_price = float(df.iloc[-1]['close'])
             result.price_position = self._get_price_position(current_price, zhongshus[-1])
-            result.zhongshu_summary = self._summarize_zhongshu(zhongshus[-1], current_price)
+            result.zhongshu_summary = self._summarize_zhongshu(zhongshus[-1], result.price_position)
         
         # 7. 判断背驰
-        beichi_type, beichi_summary, macd_div = self._check_beichi(bis, df_processed)
+        beichi_type, beichi_summary, macd_div = (
+            self._check_beichi(result.bi_is_up, result.bi_power) if len(bis) >= 5 else _BEICHI_TOO_FEW_BIS
+        )
         result.beichi_type = beichi_type
         result.beichi_summary = beichi_summary
         result.macd_divergence = macd_div
@@ -321,12 +357,13 @@ class ChanAnalyzer:
         result.trend_type, result.trend_summary = self._analyze_trend(zhongshus, bis)
         
         # 9. 确定买卖点
-        result.buy_sell_point, result.buy_sell_reason = self._identify_buy_sell_point(
-            result, df_processed
+        result.buy_sell_point, result.buy_sell_reason = (
+            self._identify_buy_sell_point(result, current_price)
+            if len(fenxings) >= 2 else _NO_BUY_SELL_POINT
         )
         
         # 10. 计算关键点位
-        result.key_levels = self._calculate_key_levels(result, df_processed)
+        result.key_levels = self._calculate_key_levels(result, current_price)
         
         # 11. 综合评分和建议
         result.chan_score = self._calculate_score(result)
@@ -335,302 +372,211 @@ class ChanAnalyzer:
         
         return result
     
-    def _process_include(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _prescan(self, df: pd.DataFrame) -> Tuple[KLineArrays, List[FenXing], np.ndarray, np.ndarray]:
         """
-        K线包含处理
+        合并执行包含处理、MACD 计算和分型识别
+        
+        三步逐K线计算由 chan_kernel.chan_prescan 一次遍历完成；
+        只从 df 读取所需列，不复制整个 DataFrame
         
-        包含关系：当两根K线高低点存在包含关系时，合并为一根
-        - 上涨中取高高、低高
-        - 下跌中取低低、高低
+        Returns:
+            (逐K线数组, 过滤后的分型, 与分型对齐的K线位置, 与分型对齐的顶分型标记)
         """
-        df = df.copy()
-        
-        # 添加处理后的高低点列
-        df['high_p'] = df['high'].astype(float)
-        df['low_p'] = df['low'].astype(float)
-        
-        # 处理包含关系
-        i = 1
-        while i < len(df):
-            prev_high = df.loc[df.index[i-1], 'high_p']
-            prev_low = df.loc[df.index[i-1], 'low_p']
-            curr_high = df.loc[df.index[i], 'high_p']
-            curr_low = df.loc[df.index[i], 'low_p']
-            
-            # 判断包含关系
-            is_include = (
-                (prev_high >= curr_high and prev_low <= curr_low) or
-                (curr_high >= prev_high and curr_low <= prev_low)
-            )
-            
-            if is_include:
-                # 判断方向（通过前两根K线的趋势）
-                if i >= 2:
-                    prev2_high = df.loc[df.index[i-2], 'high_p']
-                    is_up = prev_high > prev2_high
-                else:
-                    is_up = curr_high > prev_high
-                
-                if is_up:
-                    # 上涨中取高高、低高
-                    new_high = max(prev_high, curr_high)
-                    new_low = max(prev_low, curr_low)
-                else:
-                    # 下跌中取低低、高低
-                    new_high = min(prev_high, curr_high)
-                    new_low = min(prev_low, curr_low)
-                
-                df.loc[df.index[i], 'high_p'] = new_high
-                df.loc[df.index[i], 'low_p'] = new_low
-            
-            i += 1
+        high_p, low_p, macd_dif, macd_dea, macd_bar, fx_index, fx_is_top = chan_kernel.chan_prescan(
+            df['high'].to_numpy(dtype=np.float64),
+            df['low'].to_numpy(dtype=np.float64),
+            df['close'].to_numpy(dtype=np.float64),
+        )
+        bars = KLineArrays(
+            high_p=high_p,
+            low_p=low_p,
+            macd_dif=macd_dif,
+            macd_dea=macd_dea,
+            macd_bar=macd_bar,
+            dates=df['date'].to_numpy(),
+            macd_bar_cumsum=np.concatenate(([0.0], np.cumsum(np.nan_to_num(macd_bar, nan=0.0)))),
+        )
         
-        return df
+        # 先在数组上完成顶底交替过滤，只为保留下来的分型构造对象
+        keep = self._filter_fenxing_index(
+            fx_index, fx_is_top, np.where(fx_is_top, high_p[fx_index], low_p[fx_index])
+        )
+        fx_index = fx_index[keep]
+        fx_is_top = fx_is_top[keep]
+        return bars, self._make_fenxings(bars, fx_index, fx_is_top), fx_index, fx_is_top
     
-    def _calculate_macd(self, df: pd.DataFrame) -> pd.DataFrame:
-        """计算MACD指标"""
-        df = df.copy()
-        
-        close = df['close'].astype(float)
-        
-        # EMA计算
-        ema12 = close.ewm(span=12, adjust=False).mean()
-        ema26 = close.ewm(span=26, adjust=False).mean()
-        
-        # DIF
-        df['macd_dif'] = ema12 - ema26
-        
-        # DEA (信号线)
-        df['macd_dea'] = df['macd_dif'].ewm(span=9, adjust=False).mean()
-        
-        # MACD柱
-        df['macd_bar'] = 2 * (df['macd_dif'] - df['macd_dea'])
-        
-        return df
+    @staticmethod
+    def _make_fenxings(
+        bars: KLineArrays,
+        fx_index: np.ndarray,
+        fx_is_top: np.ndarray,
+    ) -> List[FenXing]:
+        """按分型位置和顶/底标记构造分型对象"""
+        fenxings = []
+        date_strs = ChanAnalyzer._format_dates(bars.dates[fx_index])
+        highs = bars.high_p[fx_index].tolist()
+        lows = bars.low_p[fx_index].tolist()
+        for i, is_top, date_str, fx_high, fx_low in zip(
+            fx_index.tolist(), fx_is_top.tolist(), date_strs, highs, lows
+        ):
+            fx = FenXing(
+                index=i,
+                type=_TOP if is_top else _BOTTOM,
+                high=fx_high,
+                low=fx_low,
+                date=date_str,
+                fx_value=fx_high if is_top else fx_low
+            )
+            fenxings.append(fx)
+        return fenxings
     
-    def _identify_fenxing(self, df: pd.DataFrame) -> List[FenXing]:
+    @staticmethod
+    def _format_dates(dates: np.ndarray) -> List[str]:
         """
-        识别分型
+        日期格式化为 YYYY-MM-DD 字符串
         
-        顶分型：中间K线高点比前后都高
-        底分型：中间K线低点比前后都低
+        datetime64 数组整体交给 NumPy 格式化（不逐个构造 Timestamp）；
+        其他类型逐个处理：有 strftime 的按日期格式化，否则直接转字符串
         """
-        fenxings = []
-        
-        for i in range(1, len(df) - 1):
-            prev_high = df.loc[df.index[i-1], 'high_p']
-            curr_high = df.loc[df.index[i], 'high_p']
-            next_high = df.loc[df.index[i+1], 'high_p']
-            
-            prev_low = df.loc[df.index[i-1], 'low_p']
-            curr_low = df.loc[df.index[i], 'low_p']
-            next_low = df.loc[df.index[i+1], 'low_p']
-            
-            date_val = df.loc[df.index[i], 'date']
-            if hasattr(date_val, 'strftime'):
-                date_str = date_val.strftime('%Y-%m-%d')
-            else:
-                date_str = str(date_val)
-            
-            # 顶分型判断
-            if curr_high > prev_high and curr_high > next_high:
-                fx = FenXing(
-                    index=i,
-                    type=FenXingType.TOP,
-                    high=float(curr_high),
-                    low=float(curr_low),
-                    date=date_str
-                )
-                fenxings.append(fx)
-            
-            # 底分型判断
-            elif curr_low < prev_low and curr_low < next_low:
-                fx = FenXing(
-                    index=i,
-                    type=FenXingType.BOTTOM,
-                    high=float(curr_high),
-                    low=float(curr_low),
-                    date=date_str
-                )
-                fenxings.append(fx)
-        
-        # 过滤：相邻分型必须是顶底交替
-        filtered = self._filter_fenxing(fenxings)
-        
-        return filtered
+        if dates.dtype.kind == 'M':
+            return np.datetime_as_string(dates, unit='D').tolist()
+        return [
+            date_val.strftime('%Y-%m-%d') if hasattr(date_val, 'strftime') else str(date_val)
+            for date_val in dates
+        ]
     
-    def _filter_fenxing(self, fenxings: List[FenXing]) -> List[FenXing]:
+    def _filter_fenxing_index(
+        self, fx_index: np.ndarray, fx_is_top: np.ndarray, fx_value: np.ndarray
+    ) -> np.ndarray:
         """
-        过滤分型，确保顶底交替
+        在分型数组上执行顶底交替过滤，返回保留分型的位置
         
-        如果出现连续顶分型，取最高的
-        如果出现连续底分型，取最低的
+        - 同类型分型，取极值（顶取更高、底取更低）
+        - 不同类型，检查是否满足最小K线间隔；间隔太近的分型直接丢弃
         """
-        if not fenxings:
-            return []
-        
-        filtered = [fenxings[0]]
-        
-        for fx in fenxings[1:]:
-            last = filtered[-1]
-            
-            if fx.type == last.type:
-                # 同类型分型，取极值
-                if fx.type == FenXingType.TOP:
-                    if fx.high > last.high:
-                        filtered[-1] = fx
-                else:  # BOTTOM
-                    if fx.low < last.low:
-                        filtered[-1] = fx
-            else:
-                # 不同类型，检查是否满足最小K线间隔
-                if fx.index - last.index >= self.MIN_K_BETWEEN_FX:
-                    filtered.append(fx)
-                else:
-                    # 间隔太近，保留更极端的
-                    if fx.type == FenXingType.TOP and fx.high > last.low:
-                        # 顶分型高于前底分型低点，可能形成有效笔
-                        pass  # 暂时不处理
-        
-        return filtered
+        return chan_kernel.filter_fenxing(fx_index, fx_is_top, fx_value, self.MIN_K_BETWEEN_FX)
     
-    def _build_bi(self, fenxings: List[FenXing], df: pd.DataFrame) -> List[Bi]:
+    def _build_bi(
+        self, result: ChanAnalysisResult, bars: KLineArrays
+    ) -> Tuple[List[Bi], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
         """
         构建笔
         
-        连接相邻的顶底分型形成笔
-        """
-        bis = []
+        连接相邻的顶底分型形成笔；方向、高低点和力度先在分型数组上对所有相邻分型对整列计算，
+        循环中只构造对象
         
-        if len(fenxings) < 2:
-            return bis
+        Returns:
+            (笔列表, 上升笔标记, 笔高点, 笔低点, 笔力度)，数组与笔列表一一对齐
+        """
+        fenxings = result.fenxings
+        fx_index = result.fenxing_index
+        fx_is_top = result.fenxing_is_top
+        fx_high = result.fenxing_high
+        fx_low = result.fenxing_low
+        start_is_top = fx_is_top[:-1]
+        
+        # 底→顶为上升笔、顶→底为下降笔；同类型相邻为无效的分型组合
+        pos = np.flatnonzero(start_is_top != fx_is_top[1:])
+        
+        # 笔的高低点：起止分型中的极值（与 max/min 相同，仅当后者严格更大/更小时取后者）
+        start_high, end_high = fx_high[:-1][pos], fx_high[1:][pos]
+        start_low, end_low = fx_low[:-1][pos], fx_low[1:][pos]
+        bi_high = np.where(end_high > start_high, end_high, start_high)
+        bi_low = np.where(end_low < start_low, end_low, start_low)
+        bi_is_up = ~start_is_top[pos]
+        
+        # 计算笔的MACD力度（面积）：MACD 柱前缀和之差，区间含首尾两根K线
+        cumsum = bars.macd_bar_cumsum
+        bi_power = np.abs(cumsum[fx_index[1:][pos] + 1] - cumsum[fx_index[:-1][pos]])
         
-        for i in range(len(fenxings) - 1):
-            start_fx = fenxings[i]
-            end_fx = fenxings[i + 1]
-            
-            # 确定笔方向
-            if start_fx.type == FenXingType.BOTTOM and end_fx.type == FenXingType.TOP:
-                direction = BiDirection.UP
-            elif start_fx.type == FenXingType.TOP and end_fx.type == FenXingType.BOTTOM:
-                direction = BiDirection.DOWN
-            else:
-                continue  # 无效的分型组合
-            
-            # 计算笔的MACD力度（面积）
-            power = self._calculate_bi_power(start_fx.index, end_fx.index, df)
-            
+        bis = []
+        for i, is_up, high, low, power in zip(
+            pos.tolist(), bi_is_up.tolist(), bi_high.tolist(), bi_low.tolist(), bi_power.tolist()
+        ):
             bi = Bi(
-                start_fx=start_fx,
-                end_fx=end_fx,
-                direction=direction,
+                start_fx=fenxings[i],
+                end_fx=fenxings[i + 1],
+                direction=_UP if is_up else _DOWN,
+                high=high,
+                low=low,
                 power=power
             )
             bis.append(bi)
         
-        return bis
+        return bis, bi_is_up, bi_high, bi_low, bi_power
     
-    def _calculate_bi_power(self, start_idx: int, end_idx: int, df: pd.DataFrame) -> float:
-        """计算笔的MACD力度（面积）"""
-        if 'macd_bar' not in df.columns:
-            return 0.0
-        
-        try:
-            macd_slice = df.loc[start_idx:end_idx, 'macd_bar']
-            return abs(macd_slice.sum())
-        except:
-            return 0.0
-    
-    def _build_xianduan(self, bis: List[Bi]) -> List[XianDuan]:
+    def _build_xianduan(
+        self, bis: List[Bi], bi_is_up: np.ndarray, bi_high: np.ndarray, bi_low: np.ndarray
+    ) -> List[XianDuan]:
         """
         构建线段
         
         线段由至少3笔构成，且要满足特征序列的破坏
-        简化版：每3笔构成一个线段
+        简化版：每3笔构成一个线段，步进2（允许线段有重叠）；
+        各线段之间没有依赖，方向和极值在笔数组上整列计算
         """
         xianduans = []
         
         if len(bis) < 3:
             return xianduans
         
-        i = 0
-        while i < len(bis) - 2:
-            # 取连续3笔
-            segment_bis = bis[i:i+3]
-            
-            # 确定线段方向（以第一笔方向为准）
-            first_bi = segment_bis[0]
-            if first_bi.direction == BiDirection.UP:
-                direction = XianDuanDirection.UP
-            else:
-                direction = XianDuanDirection.DOWN
-            
+        starts = np.arange(0, len(bis) - 2, 2)
+        
+        # 线段极值：连续3笔高点的最大值、低点的最小值。
+        # 与内置 max/min 一致：从左到右仅当后者严格更大/更小时取后者（NaN 不会传播）
+        xd_high = bi_high[starts]
+        xd_low = bi_low[starts]
+        for k in (1, 2):
+            high = bi_high[starts + k]
+            low = bi_low[starts + k]
+            xd_high = np.where(high > xd_high, high, xd_high)
+            xd_low = np.where(low < xd_low, low, xd_low)
+        
+        for i, is_up, high, low in zip(
+            starts.tolist(), bi_is_up[starts].tolist(), xd_high.tolist(), xd_low.tolist()
+        ):
             xd = XianDuan(
-                bis=segment_bis,
-                direction=direction
+                bis=bis[i:i+3],
+                # 确定线段方向（以第一笔方向为准）
+                direction=XianDuanDirection.UP if is_up else XianDuanDirection.DOWN,
+                high=high,
+                low=low
             )
             xianduans.append(xd)
-            
-            i += 2  # 步进2，允许线段有重叠
         
         return xianduans
     
-    def _identify_zhongshu(self, bis: List[Bi]) -> List[ZhongShu]:
+    def _identify_zhongshu(
+        self, bis: List[Bi], bi_high: np.ndarray, bi_low: np.ndarray
+    ) -> List[ZhongShu]:
         """
         识别中枢
         
         中枢定义：至少3笔的重叠区域
         ZG = min(各笔高点)
         ZD = max(各笔低点)
-        如果 ZG > ZD，则形成有效中枢
+        如果 ZG > ZD，则形成有效中枢，并继续加入后续仍保持重叠的笔
+        
+        逐笔扫描由 chan_kernel.scan_zhongshu 完成，这里只按返回的笔区间构造对象
         """
         zhongshus = []
         
         if len(bis) < 3:
             return zhongshus
         
-        i = 0
-        while i < len(bis) - 2:
-            # 尝试从当前位置构建中枢
-            zg = min(bis[i].high, bis[i+1].high, bis[i+2].high)
-            zd = max(bis[i].low, bis[i+1].low, bis[i+2].low)
-            
-            if zg > zd:  # 有效中枢
-                # 计算中枢的完整范围
-                zs_bis = [bis[i], bis[i+1], bis[i+2]]
-                gg = max(bi.high for bi in zs_bis)
-                dd = min(bi.low for bi in zs_bis)
-                
-                # 尝试扩展中枢（加入后续满足条件的笔）
-                j = i + 3
-                while j < len(bis):
-                    new_zg = min(zg, bis[j].high)
-                    new_zd = max(zd, bis[j].low)
-                    
-                    if new_zg > new_zd:
-                        # 可以扩展
-                        zg = new_zg
-                        zd = new_zd
-                        zs_bis.append(bis[j])
-                        gg = max(gg, bis[j].high)
-                        dd = min(dd, bis[j].low)
-                        j += 1
-                    else:
-                        break
-                
-                zs = ZhongShu(
-                    bis=zs_bis,
-                    zg=zg,
-                    zd=zd,
-                    gg=gg,
-                    dd=dd,
-                    direction=bis[i].direction
-                )
-                zhongshus.append(zs)
-                
-                i = j  # 跳过已构建中枢的笔
-            else:
-                i += 1
+        starts, ends, zg, zd, gg, dd = chan_kernel.scan_zhongshu(bi_high, bi_low)
+        for i, j, zs_zg, zs_zd, zs_gg, zs_dd in zip(
+            starts.tolist(), ends.tolist(), zg.tolist(), zd.tolist(), gg.tolist(), dd.tolist()
+        ):
+            zs = ZhongShu(
+                bis=bis[i:j],
+                zg=zs_zg,
+                zd=zs_zd,
+                gg=zs_gg,
+                dd=zs_dd,
+                direction=bis[i].direction
+            )
+            zhongshus.append(zs)
         
         return zhongshus
     
@@ -649,8 +595,8 @@ class ChanAnalyzer:
     
     def _check_beichi(
         self, 
-        bis: List[Bi], 
-        df: pd.DataFrame
+        bi_is_up: np.ndarray, 
+        bi_power: np.ndarray
     ) -> Tuple[BeiChiType, str, bool]:
         """
         判断背驰
@@ -659,36 +605,33 @@ class ChanAnalyzer:
         1. 趋势背驰：两段同向走势，后一段力度弱于前一段
         2. 盘整背驰：同一中枢内，后一段力度弱于前一段
         
-        通过MACD面积对比判断
+        通过MACD面积对比判断（bi_is_up / bi_power 为与笔列表对齐的方向和力度数组）
         """
-        if len(bis) < 5:
-            return BeiChiType.NONE, "笔数不足，无法判断背驰", False
+        if len(bi_power) < 5:
+            return _BEICHI_TOO_FEW_BIS
         
         # 取最后5笔进行分析
-        recent_bis = bis[-5:]
+        recent_is_up = bi_is_up[-5:]
+        recent_power = bi_power[-5:]
         
         # 检查同向笔的力度对比
-        # 找到最近两段同向笔
-        last_bi = recent_bis[-1]
-        
-        # 找前一段同向笔
-        prev_same_dir_bi = None
-        for bi in reversed(recent_bis[:-1]):
-            if bi.direction == last_bi.direction:
-                prev_same_dir_bi = bi
-                break
+        # 找到最近两段同向笔：最后一笔之前最近的同向笔
+        last_is_up = bool(recent_is_up[-1])
+        same_dir = np.flatnonzero(recent_is_up[:-1] == last_is_up)
         
-        if prev_same_dir_bi is None:
+        if not same_dir.size:
             return BeiChiType.NONE, "未找到同向笔，无法判断背驰", False
         
         # 计算力度对比
-        power_ratio = last_bi.power / prev_same_dir_bi.power if prev_same_dir_bi.power > 0 else 1
+        last_power = float(recent_power[-1])
+        prev_power = float(recent_power[same_dir[-1]])
+        power_ratio = last_power / prev_power if prev_power > 0 else 1
         
         macd_div = False
         
         if power_ratio < 0.618:  # 黄金分割点
             macd_div = True
-            if last_bi.direction == BiDirection.DOWN:
+            if not last_is_up:
                 # 下跌背驰 = 底背驰 = 买入机会
                 return (
                     BeiChiType.TREND_BEICHI,
@@ -715,7 +658,7 @@ class ChanAnalyzer:
             if bis:
                 # 没有中枢，看笔的方向
                 last_bi = bis[-1]
-                if last_bi.direction == BiDirection.UP:
+                if last_bi.direction is _UP:
                     return TrendType.UP_TREND, "无中枢，当前处于上升笔中"
                 else:
                     return TrendType.DOWN_TREND, "无中枢，当前处于下降笔中"
@@ -738,7 +681,7 @@ class ChanAnalyzer:
     def _identify_buy_sell_point(
         self, 
         result: ChanAnalysisResult,
-        df: pd.DataFrame
+        current_price: float
     ) -> Tuple[BuySellPoint, str]:
         """
         识别买卖点
@@ -747,14 +690,12 @@ class ChanAnalyzer:
         二买：一买后回踩不破低点
         三买：离开中枢后回踩不进中枢
         """
-        current_price = float(df.iloc[-1]['close'])
-        
         # 检查是否有背驰
-        if result.beichi_type != BeiChiType.NONE:
-            if result.last_bi and result.last_bi.direction == BiDirection.DOWN:
+        if result.beichi_type is not BeiChiType.NONE:
+            if result.last_bi and result.last_bi.direction is _DOWN:
                 # 底背驰 = 一买
                 return BuySellPoint.BUY_1, "出现底背驰，形成第一类买点"
-            elif result.last_bi and result.last_bi.direction == BiDirection.UP:
+            elif result.last_bi and result.last_bi.direction is _UP:
                 # 顶背驰 = 一卖
                 return BuySellPoint.SELL_1, "出现顶背驰，形成第一类卖点"
         
@@ -764,41 +705,39 @@ class ChanAnalyzer:
             
             # 价格在中枢上方，且最近是回踩
             if current_price > zs.zg:
-                if result.last_bi and result.last_bi.direction == BiDirection.DOWN:
+                if result.last_bi and result.last_bi.direction is _DOWN:
                     if result.last_bi.low > zs.zg:
                         return BuySellPoint.BUY_3, f"离开中枢后回踩，低点{result.last_bi.low:.2f}在中枢上沿{zs.zg:.2f}上方，形成三买"
             
             # 价格在中枢下方，且最近是反弹
             elif current_price < zs.zd:
-                if result.last_bi and result.last_bi.direction == BiDirection.UP:
+                if result.last_bi and result.last_bi.direction is _UP:
                     if result.last_bi.high < zs.zd:
                         return BuySellPoint.SELL_3, f"离开中枢后反弹，高点{result.last_bi.high:.2f}在中枢下沿{zs.zd:.2f}下方，形成三卖"
         
         # 检查二买二卖（需要参考前一次买卖点）
-        if len(result.bis) >= 4 and result.last_fenxing:
+        # 过滤后的分型顶底交替，前一个同类型分型即倒数第三个，直接按位置读分型数组
+        if len(result.bis) >= 4 and result.last_fenxing and len(result.fenxings) >= 3:
             # 简化版：如果最近底分型不创新低，可能是二买
-            if result.last_fenxing.type == FenXingType.BOTTOM:
-                prev_bottoms = [fx for fx in result.fenxings if fx.type == FenXingType.BOTTOM]
-                if len(prev_bottoms) >= 2:
-                    if result.last_fenxing.low > prev_bottoms[-2].low:
-                        return BuySellPoint.BUY_2, f"回踩低点{result.last_fenxing.low:.2f}未破前低{prev_bottoms[-2].low:.2f}，形成二买"
+            if result.last_fenxing.type is _BOTTOM:
+                prev_bottom_low = float(result.fenxing_low[-3])
+                if result.last_fenxing.low > prev_bottom_low:
+                    return BuySellPoint.BUY_2, f"回踩低点{result.last_fenxing.low:.2f}未破前低{prev_bottom_low:.2f}，形成二买"
             
-            elif result.last_fenxing.type == FenXingType.TOP:
-                prev_tops = [fx for fx in result.fenxings if fx.type == FenXingType.TOP]
-                if len(prev_tops) >= 2:
-                    if result.last_fenxing.high < prev_tops[-2].high:
-                        return BuySellPoint.SELL_2, f"反弹高点{result.last_fenxing.high:.2f}未破前高{prev_tops[-2].high:.2f}，形成二卖"
+            elif result.last_fenxing.type is _TOP:
+                prev_top_high = float(result.fenxing_high[-3])
+                if result.last_fenxing.high < prev_top_high:
+                    return BuySellPoint.SELL_2, f"反弹高点{result.last_fenxing.high:.2f}未破前高{prev_top_high:.2f}，形成二卖"
         
-        return BuySellPoint.NONE, "当前无明确买卖点"
+        return _NO_BUY_SELL_POINT
     
     def _calculate_key_levels(
         self, 
         result: ChanAnalysisResult,
-        df: pd.DataFrame
+        current_price: float
     ) -> Dict[str, float]:
         """计算关键点位"""
         levels = {}
-        current_price = float(df.iloc[-1]['close'])
         levels['current_price'] = current_price
         
         # 中枢点位
@@ -811,16 +750,18 @@ class ChanAnalyzer:
         
         # 最近分型点位
         if result.fenxings:
-            recent_tops = [fx for fx in result.fenxings[-10:] if fx.type == FenXingType.TOP]
-            recent_bottoms = [fx for fx in result.fenxings[-10:] if fx.type == FenXingType.BOTTOM]
+            # 顶分型高点、底分型低点均经过严格比较得出，不含 NaN
+            recent_is_top = result.fenxing_is_top[-10:]
+            recent_tops = result.fenxing_high[-10:][recent_is_top]
+            recent_bottoms = result.fenxing_low[-10:][~recent_is_top]
             
-            if recent_tops:
-                levels['recent_top'] = max(fx.high for fx in recent_tops)
-            if recent_bottoms:
-                levels['recent_bottom'] = min(fx.low for fx in recent_bottoms)
+            if recent_tops.size:
+                levels['recent_top'] = float(recent_tops.max())
+            if recent_bottoms.size:
+                levels['recent_bottom'] = float(recent_bottoms.min())
         
         # 建议点位
-        if result.buy_sell_point in [BuySellPoint.BUY_1, BuySellPoint.BUY_2, BuySellPoint.BUY_3]:
+        if result.buy_sell_point in _BUY_POINTS:
             # 买入建议
             if result.current_zhongshu:
                 levels['stop_loss'] = result.current_zhongshu.zd * 0.97  # 中枢下沿下方3%
@@ -830,7 +771,7 @@ class ChanAnalyzer:
             if 'recent_top' in levels:
                 levels['target'] = levels['recent_top']
         
-        elif result.buy_sell_point in [BuySellPoint.SELL_1, BuySellPoint.SELL_2, BuySellPoint.SELL_3]:
+        elif result.buy_sell_point in _SELL_POINTS:
             # 卖出建议
             if result.current_zhongshu:
                 levels['stop_loss'] = result.current_zhongshu.zg * 1.03
@@ -855,30 +796,30 @@ class ChanAnalyzer:
         score = 50  # 基础分
         
         # 1. 趋势方向（30分）
-        if result.trend_type == TrendType.UP_TREND:
+        if result.trend_type is TrendType.UP_TREND:
             score += 15
-        elif result.trend_type == TrendType.DOWN_TREND:
+        elif result.trend_type is TrendType.DOWN_TREND:
             score -= 15
         
         # 2. 买卖点信号（30分）
-        if result.buy_sell_point in [BuySellPoint.BUY_1, BuySellPoint.BUY_2, BuySellPoint.BUY_3]:
-            if result.buy_sell_point == BuySellPoint.BUY_1:
+        if result.buy_sell_point in _BUY_POINTS:
+            if result.buy_sell_point is BuySellPoint.BUY_1:
                 score += 25  # 一买最强
-            elif result.buy_sell_point == BuySellPoint.BUY_3:
+            elif result.buy_sell_point is BuySellPoint.BUY_3:
                 score += 20  # 三买次之
             else:
                 score += 15  # 二买
-        elif result.buy_sell_point in [BuySellPoint.SELL_1, BuySellPoint.SELL_2, BuySellPoint.SELL_3]:
-            if result.buy_sell_point == BuySellPoint.SELL_1:
+        elif result.buy_sell_point in _SELL_POINTS:
+            if result.buy_sell_point is BuySellPoint.SELL_1:
                 score -= 25
-            elif result.buy_sell_point == BuySellPoint.SELL_3:
+            elif result.buy_sell_point is BuySellPoint.SELL_3:
                 score -= 20
             else:
                 score -= 15
         
         # 3. 背驰信号（20分）
-        if result.beichi_type != BeiChiType.NONE:
-            if result.last_bi and result.last_bi.direction == BiDirection.DOWN:
+        if result.beichi_type is not BeiChiType.NONE:
+            if result.last_bi and result.last_bi.direction is _DOWN:
                 score += 15  # 底背驰加分
             else:
                 score -= 15  # 顶背驰减分
@@ -908,23 +849,23 @@ class ChanAnalyzer:
         else:
             return "卖出：缠论信号看空，建议离场"
     
-    def _summarize_fenxings(self, fenxings: List[FenXing]) -> str:
+    def _summarize_fenxings(self, fenxings: List[FenXing], fenxing_is_top: np.ndarray) -> str:
         """分型摘要"""
         if not fenxings:
             return "无有效分型"
         
-        tops = sum(1 for fx in fenxings if fx.type == FenXingType.TOP)
-        bottoms = sum(1 for fx in fenxings if fx.type == FenXingType.BOTTOM)
+        tops = int(np.count_nonzero(fenxing_is_top))
+        bottoms = len(fenxings) - tops
         last_fx = fenxings[-1]
         
         return f"共{len(fenxings)}个分型（顶{tops}/底{bottoms}），最近为{last_fx.type.value}（{last_fx.date}）"
     
-    def _summarize_bis(self, bis: List[Bi]) -> str:
+    def _summarize_bis(self, bis: List[Bi], bi_is_up: np.ndarray) -> str:
         """笔摘要"""
         if not bis:
             return "无有效笔"
         
-        up_bis = sum(1 for bi in bis if bi.direction == BiDirection.UP)
+        up_bis = int(np.count_nonzero(bi_is_up))
         down_bis = len(bis) - up_bis
         last_bi = bis[-1]
         
@@ -938,38 +879,44 @@ class ChanAnalyzer:
         last_xd = xianduans[-1]
         return f"共{len(xianduans)}段，当前{last_xd.direction.value}（高{last_xd.high:.2f}/低{last_xd.low:.2f}）"
     
-    def _summarize_zhongshu(self, zs: ZhongShu, price: float) -> str:
-        """中枢摘要"""
-        position = self._get_price_position(price, zs)
+    def _summarize_zhongshu(self, zs: ZhongShu, position: str) -> str:
+        """中枢摘要（position 为 _get_price_position 已算出的价格位置描述）"""
         return f"中枢区间 [{zs.zd:.2f}, {zs.zg:.2f}]，当前价格{position}"
     
     def _generate_summary(self, result: ChanAnalysisResult) -> str:
-        """生成综合分析摘要"""
-        parts = []
-        
-        # 趋势判断
-        parts.append(f"【趋势】{result.trend_type.value}：{result.trend_summary}")
+        """
+        生成综合分析摘要
         
+        趋势行总是存在，其余各行按条件生成为带前导换行的片段（不满足时为空串），
+        最后一次拼接，不经过列表 append + join
+        """
         # 中枢位置
-        if result.current_zhongshu:
-            parts.append(f"【中枢】{result.zhongshu_summary}")
+        zhongshu_line = f"\n【中枢】{result.zhongshu_summary}" if result.current_zhongshu else ""
         
         # 背驰信号
-        if result.beichi_type != BeiChiType.NONE:
-            parts.append(f"【背驰】{result.beichi_summary}")
+        beichi_line = (
+            f"\n【背驰】{result.beichi_summary}" if result.beichi_type is not BeiChiType.NONE else ""
+        )
         
         # 买卖点
-        if result.buy_sell_point != BuySellPoint.NONE:
-            parts.append(f"【信号】{result.buy_sell_point.value}：{result.buy_sell_reason}")
+        signal_line = (
+            f"\n【信号】{result.buy_sell_point._value_}：{result.buy_sell_reason}"
+            if result.buy_sell_point is not BuySellPoint.NONE else ""
+        )
         
         # 关键点位
         levels = result.key_levels
-        if 'zhongshu_zg' in levels:
-            parts.append(f"【点位】中枢上沿{levels['zhongshu_zg']:.2f}，中枢下沿{levels['zhongshu_zd']:.2f}")
-        if 'stop_loss' in levels:
-            parts.append(f"【止损】{levels['stop_loss']:.2f}")
+        level_line = (
+            f"\n【点位】中枢上沿{levels['zhongshu_zg']:.2f}，中枢下沿{levels['zhongshu_zd']:.2f}"
+            if 'zhongshu_zg' in levels else ""
+        )
+        stop_loss_line = f"\n【止损】{levels['stop_loss']:.2f}" if 'stop_loss' in levels else ""
         
-        return "\n".join(parts)
+        # 趋势判断
+        return (
+            f"【趋势】{result.trend_type._value_}：{result.trend_summary}"
+            f"{zhongshu_line}{beichi_line}{signal_line}{level_line}{stop_loss_line}"
+        )
     
     def format_analysis(self, result: ChanAnalysisResult) -> str:
         """
@@ -981,61 +928,59 @@ class ChanAnalyzer:
         Returns:
             格式化的分析文本
         """
-        lines = [
-            f"=== {result.code} 缠论分析 ===",
-            f"",
-            f"📊 缠论评分: {result.chan_score}/100",
-            f"🎯 操作建议: {result.operation_suggestion}",
-            f"",
-            f"📈 趋势判断: {result.trend_type.value}",
-            f"   {result.trend_summary}",
-            f"",
-            f"🔍 分型: {result.fenxing_summary}",
-            f"📏 笔: {result.bi_summary}",
-            f"📐 线段: {result.xianduan_summary}",
-            f"",
-        ]
-        
-        if result.current_zhongshu:
-            lines.extend([
-                f"🎯 中枢分析:",
-                f"   {result.zhongshu_summary}",
-                f"   价格位置: {result.price_position}",
-                f"",
-            ])
-        
-        if result.beichi_type != BeiChiType.NONE:
-            lines.extend([
-                f"⚡ 背驰信号:",
-                f"   类型: {result.beichi_type.value}",
-                f"   {result.beichi_summary}",
-                f"",
-            ])
-        
-        if result.buy_sell_point != BuySellPoint.NONE:
-            lines.extend([
-                f"💡 买卖点:",
-                f"   信号: {result.buy_sell_point.value}",
-                f"   {result.buy_sell_reason}",
-                f"",
-            ])
+        # 可选段落：不满足条件时为空串，满足时以空行结尾，与下一段隔开
+        zhongshu_block = (
+            f"🎯 中枢分析:\n"
+            f"   {result.zhongshu_summary}\n"
+            f"   价格位置: {result.price_position}\n"
+            f"\n"
+        ) if result.current_zhongshu else ""
+        
+        beichi_block = (
+            f"⚡ 背驰信号:\n"
+            f"   类型: {result.beichi_type._value_}\n"
+            f"   {result.beichi_summary}\n"
+            f"\n"
+        ) if result.beichi_type is not BeiChiType.NONE else ""
+        
+        signal_block = (
+            f"💡 买卖点:\n"
+            f"   信号: {result.buy_sell_point._value_}\n"
+            f"   {result.buy_sell_reason}\n"
+            f"\n"
+        ) if result.buy_sell_point is not BuySellPoint.NONE else ""
         
         # 关键点位
         levels = result.key_levels
         if levels:
-            lines.append(f"📍 关键点位:")
-            if 'current_price' in levels:
-                lines.append(f"   当前价格: {levels['current_price']:.2f}")
-            if 'zhongshu_zg' in levels:
-                lines.append(f"   中枢上沿: {levels['zhongshu_zg']:.2f}")
-            if 'zhongshu_zd' in levels:
-                lines.append(f"   中枢下沿: {levels['zhongshu_zd']:.2f}")
-            if 'stop_loss' in levels:
-                lines.append(f"   建议止损: {levels['stop_loss']:.2f}")
-            if 'target' in levels:
-                lines.append(f"   目标位: {levels['target']:.2f}")
-        
-        return "\n".join(lines)
+            levels_block = (
+                "📍 关键点位:"
+                + (f"\n   当前价格: {levels['current_price']:.2f}" if 'current_price' in levels else "")
+                + (f"\n   中枢上沿: {levels['zhongshu_zg']:.2f}" if 'zhongshu_zg' in levels else "")
+                + (f"\n   中枢下沿: {levels['zhongshu_zd']:.2f}" if 'zhongshu_zd' in levels else "")
+                + (f"\n   建议止损: {levels['stop_loss']:.2f}" if 'stop_loss' in levels else "")
+                + (f"\n   目标位: {levels['target']:.2f}" if 'target' in levels else "")
+            )
+        else:
+            # 无关键点位时去掉最后一段末尾的空行，与逐行 join 的结果保持一致
+            levels_block = None
+        
+        text = (
+            f"=== {result.code} 缠论分析 ===\n"
+            f"\n"
+            f"📊 缠论评分: {result.chan_score}/100\n"
+            f"🎯 操作建议: {result.operation_suggestion}\n"
+            f"\n"
+            f"📈 趋势判断: {result.trend_type._value_}\n"
+            f"   {result.trend_summary}\n"
+            f"\n"
+            f"🔍 分型: {result.fenxing_summary}\n"
+            f"📏 笔: {result.bi_summary}\n"
+            f"📐 线段: {result.xianduan_summary}\n"
+            f"\n"
+            f"{zhongshu_block}{beichi_block}{signal_block}"
+        )
+        return text + levels_block if levels_block is not None else text[:-1]
 
 
 def analyze_chan(df: pd.DataFrame, code: str) -> ChanAnalysisResult:
@@ -1053,33 +998,84 @@ def analyze_chan(df: pd.DataFrame, code: str) -> ChanAnalysisResult:
     return analyzer.analyze(df, code)
 
 
+# analyze 实际读取的列：批量分析时只把这几列发送给子进程，减少序列化数据量
+_ANALYZE_COLUMNS = ['date', 'high', 'low', 'close']
+
+
+def _select_analyze_columns(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """只保留 analyze 读取的列（缺列时原样返回，由 analyze 自行处理）"""
+    if df is None or not set(_ANALYZE_COLUMNS).issubset(df.columns):
+        return df
+    return df[_ANALYZE_COLUMNS]
+
+
+def _analyze_chan_worker(code: str, df: pd.DataFrame, strict_mode: bool) -> Optional[ChanAnalysisResult]:
+    """批量分析的子进程入口（模块级函数，可被 pickle）"""
+    try:
+        return ChanAnalyzer(strict_mode=strict_mode).analyze(df, code)
+    except Exception as e:
+        logger.error(f"[{code}] 缠论分析失败: {e}")
+        return None
+
+
+def analyze_chan_batch(
+    df_dict: Dict[str, pd.DataFrame],
+    strict_mode: bool = False,
+    max_workers: Optional[int] = None,
+) -> Dict[str, ChanAnalysisResult]:
+    """
+    便捷函数：多进程批量缠论分析
+    
+    analyze 为纯 CPU 计算，多进程可绕开 GIL 按核数扩展吞吐。
+    每只股票只发送 date/high/low/close 四列到子进程，结果对象体积小，回传开销可忽略。
+    
+    Args:
+        df_dict: 股票代码 -> OHLCV DataFrame
+        strict_mode: 传给 ChanAnalyzer 的严格模式
+        max_workers: 最大进程数，默认 CPU 核数
+        
+    Returns:
+        股票代码 -> ChanAnalysisResult（分析出错的股票不在结果中）
+    """
+    codes = list(df_dict)
+    frames = [_select_analyze_columns(df) for df in df_dict.values()]
+    
+    workers = min(max_workers or os.cpu_count() or 1, len(codes))
+    if workers <= 1:
+        results = [_analyze_chan_worker(code, df, strict_mode) for code, df in zip(codes, frames)]
+    else:
+        # 每个进程分到若干批任务，摊薄进程间通信的往返次数
+        chunksize = max(1, len(codes) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                _analyze_chan_worker, codes, frames, [strict_mode] * len(codes), chunksize=chunksize
+            ))
+    
+    return {code: result for code, result in zip(codes, results) if result is not None}
+
+
 if __name__ == "__main__":
     # 测试代码
     logging.basicConfig(level=logging.INFO)
     
     # 模拟数据测试
-    import numpy as np
-    
-    dates = pd.date_range(start='2025-01-01', periods=60, freq='D')
-    np.random.seed(42)
+    n_days = 60
+    dates = pd.date_range(start='2025-01-01', periods=n_days, freq='D')
+    rng = np.random.default_rng(42)
     
-    # 模拟一个有波动的行情
+    # 模拟一个有波动的行情：每日涨跌幅 = 周期性趋势 + 波动，价格为涨跌幅的累乘
     base_price = 10.0
-    prices = [base_price]
-    for i in range(59):
-        # 添加趋势和波动
-        trend = 0.001 * np.sin(i / 10)  # 周期性趋势
-        noise = np.random.randn() * 0.03
-        change = trend + noise
-        prices.append(prices[-1] * (1 + change))
+    steps = np.arange(n_days - 1)
+    changes = 0.001 * np.sin(steps / 10) + rng.standard_normal(n_days - 1) * 0.03
+    prices = base_price * np.cumprod(np.concatenate(([1.0], 1 + changes)))
     
     df = pd.DataFrame({
         'date': dates,
-        'open': [p * (1 - np.random.uniform(0, 0.01)) for p in prices],
-        'high': [p * (1 + np.random.uniform(0, 0.03)) for p in prices],
-        'low': [p * (1 - np.random.uniform(0, 0.03)) for p in prices],
+        'open': prices * (1 - rng.uniform(0, 0.01, n_days)),
+        'high': prices * (1 + rng.uniform(0, 0.03, n_days)),
+        'low': prices * (1 - rng.uniform(0, 0.03, n_days)),
         'close': prices,
-        'volume': [np.random.randint(1000000, 5000000) for _ in prices],
+        'volume': rng.integers(1000000, 5000000, n_days),
     })
     
     analyzer = ChanAnalyzer()
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+缠论分析器 - 数值内核
+===================================
+
+职责：
+1. 以 numba 编译的标量循环实现 ChanAnalyzer 中逐K线的计算步骤
+2. 内核只接收/返回 float64 NumPy 数组，不涉及 pandas 对象
+
+比较和取极值的写法与原 Python 实现逐条对应（包括 NaN 下的行为），
+未安装 numba 时同一份代码按普通 Python 在 NumPy 数组上执行。
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from numba_compat import njit
+
+
+@njit(cache=True)
+def _merge_include(
+    prev2_high: float,
+    prev_high: float,
+    prev_low: float,
+    curr_high: float,
+    curr_low: float,
+    has_prev2: bool,
+) -> Tuple[float, float]:
+    """
+    对当前K线做包含处理，返回处理后的 (high, low)
+
+    与前一根（已处理）K线存在包含关系时按方向合并：上涨中取高高、低高，
+    下跌中取低低、高低；方向由前两根已处理K线的高点决定（不足两根时比较当前与前一根）。
+    只接收标量：逐K线调用时传数组参数的开销远大于计算本身
+    """
+    is_include = (
+        (prev_high >= curr_high and prev_low <= curr_low)
+        or (curr_high >= prev_high and curr_low <= prev_low)
+    )
+    if not is_include:
+        return curr_high, curr_low
+
+    if has_prev2:
+        is_up = prev_high > prev2_high
+    else:
+        is_up = curr_high > prev_high
+
+    # 与内置 max/min 一致：仅当后者严格更大/更小时取后者
+    if is_up:
+        return (
+            curr_high if curr_high > prev_high else prev_high,
+            curr_low if curr_low > prev_low else prev_low,
+        )
+    return (
+        curr_high if curr_high < prev_high else prev_high,
+        curr_low if curr_low < prev_low else prev_low,
+    )
+
+
+@njit(cache=True)
+def _ewm_step(weighted: float, old_wt: float, nobs: float, cur: float, alpha: float):
+    """
+    pandas ewm(adjust=False, ignore_na=False).mean() 的单步递推（第 2 个及以后的值）
+
+    逐条对应 pandas 的实现（含归一化除法和常数序列的短路），保证结果逐位一致；
+    返回更新后的 (weighted, old_wt, nobs)
+    """
+    is_observation = cur == cur
+    if is_observation:
+        nobs += 1
+    if weighted == weighted:
+        old_wt *= 1.0 - alpha
+        if is_observation:
+            if weighted != cur:
+                weighted = old_wt * weighted + alpha * cur
+                weighted = weighted / (old_wt + alpha)
+            old_wt = 1.0
+    elif is_observation:
+        weighted = cur
+    return weighted, old_wt, nobs
+
+
+# MACD(12,26,9) 的平滑系数，与 pandas 算法相同：alpha = 1 / (1 + com)，com = (span - 1) / 2。
+# 模块级常量在 numba 编译时按字面量折叠
+_ALPHA12 = 1.0 / (1.0 + (12 - 1) / 2.0)
+_ALPHA26 = 1.0 / (1.0 + (26 - 1) / 2.0)
+_ALPHA9 = 1.0 / (1.0 + (9 - 1) / 2.0)
+
+
+@njit(cache=True)
+def macd(close: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    MACD(12,26,9)，一次遍历返回 (DIF, DEA, MACD柱)
+
+    与 pandas ewm(span, adjust=False).mean() 组合计算的结果逐位一致（柱 = 2 * (DIF - DEA)）。
+    三条 EMA 的递推状态全部放在局部变量中；不使用 fastmath，
+    否则编译器会假定不存在 NaN，去掉 _ewm_step 中的缺失值判断
+    """
+    n = close.shape[0]
+    macd_dif = np.empty(n)
+    macd_dea = np.empty(n)
+    macd_bar = np.empty(n)
+    if n == 0:
+        return macd_dif, macd_dea, macd_bar
+
+    ema12 = close[0]
+    ema26 = close[0]
+    wt12 = 1.0
+    wt26 = 1.0
+    nobs12 = 1.0 if close[0] == close[0] else 0.0
+    nobs26 = nobs12
+    dea = 0.0
+    wt9 = 1.0
+    nobs9 = 0.0
+
+    for i in range(n):
+        if i >= 1:
+            cur = close[i]
+            ema12, wt12, nobs12 = _ewm_step(ema12, wt12, nobs12, cur, _ALPHA12)
+            ema26, wt26, nobs26 = _ewm_step(ema26, wt26, nobs26, cur, _ALPHA26)
+        dif = (ema12 if nobs12 >= 1 else np.nan) - (ema26 if nobs26 >= 1 else np.nan)
+        if i == 0:
+            dea = dif
+            nobs9 = 1.0 if dif == dif else 0.0
+        else:
+            dea, wt9, nobs9 = _ewm_step(dea, wt9, nobs9, dif, _ALPHA9)
+        dea_out = dea if nobs9 >= 1 else np.nan
+        macd_dif[i] = dif
+        macd_dea[i] = dea_out
+        macd_bar[i] = 2 * (dif - dea_out)
+
+    return macd_dif, macd_dea, macd_bar
+
+
+@njit(cache=True)
+def chan_prescan(high: np.ndarray, low: np.ndarray, close: np.ndarray):
+    """
+    一次调用完成包含处理、MACD(12,26,9) 和分型识别
+
+    MACD 由 macd() 单独遍历计算（递推状态留在寄存器中），包含处理与分型识别在同一循环中完成
+
+    Returns:
+        (high_p, low_p, macd_dif, macd_dea, macd_bar, fx_index, fx_is_top)
+        fx_index 为分型所在位置（升序），fx_is_top 标记顶分型（同时满足时按顶分型）
+    """
+    n = high.shape[0]
+    high_p = high.copy()
+    low_p = low.copy()
+    macd_dif, macd_dea, macd_bar = macd(close)
+    fx_index = np.empty(n, dtype=np.int64)
+    fx_is_top = np.empty(n, dtype=np.bool_)
+    n_fx = 0
+
+    for i in range(1, n):
+        # 1. 包含处理（只修改第 i 根）
+        high_p[i], low_p[i] = _merge_include(
+            high_p[i - 2] if i >= 2 else 0.0, high_p[i - 1], low_p[i - 1],
+            high_p[i], low_p[i], i >= 2,
+        )
+
+        # 2. 第 i 根处理完后，第 i-1 根的前后两根均已确定，判断其是否为分型
+        if i >= 2:
+            j = i - 1
+            curr_high = high_p[j]
+            curr_low = low_p[j]
+            if curr_high > high_p[j - 1] and curr_high > high_p[i]:
+                fx_index[n_fx] = j
+                fx_is_top[n_fx] = True
+                n_fx += 1
+            elif curr_low < low_p[j - 1] and curr_low < low_p[i]:
+                fx_index[n_fx] = j
+                fx_is_top[n_fx] = False
+                n_fx += 1
+
+    return high_p, low_p, macd_dif, macd_dea, macd_bar, fx_index[:n_fx], fx_is_top[:n_fx]
+
+
+@njit(cache=True)
+def filter_fenxing(fx_index: np.ndarray, fx_is_top: np.ndarray, fx_value: np.ndarray, min_gap: int) -> np.ndarray:
+    """
+    分型过滤（顶底交替），返回保留分型在输入数组中的位置
+
+    fx_value 为分型值（顶分型取高点、底分型取低点）。与前一个保留分型同类型时取更极端者
+    （严格更高/更低才替换）；类型不同且间隔不小于 min_gap 时保留，间隔太近则丢弃
+    """
+    n = fx_index.shape[0]
+    keep = np.empty(n, dtype=np.int64)
+    if n == 0:
+        return keep
+    keep[0] = 0
+    k = 1
+    for m in range(1, n):
+        last = keep[k - 1]
+        if fx_is_top[m] == fx_is_top[last]:
+            if fx_is_top[m]:
+                if fx_value[m] > fx_value[last]:
+                    keep[k - 1] = m
+            elif fx_value[m] < fx_value[last]:
+                keep[k - 1] = m
+        elif fx_index[m] - fx_index[last] >= min_gap:
+            keep[k] = m
+            k += 1
+    return keep[:k]
+
+
+@njit(cache=True)
+def scan_zhongshu(bi_high: np.ndarray, bi_low: np.ndarray):
+    """
+    中枢识别：连续3笔的重叠区间 ZG = min(高点) > ZD = max(低点) 时成立，
+    并向后逐笔扩展，直到加入下一笔后不再重叠；已纳入中枢的笔不再作为新中枢的起点
+
+    Returns:
+        (start, end, zg, zd, gg, dd)，每个中枢由笔区间 [start, end) 组成
+    """
+    n = bi_high.shape[0]
+    cap = n // 3 + 1
+    zs_start = np.empty(cap, dtype=np.int64)
+    zs_end = np.empty(cap, dtype=np.int64)
+    zs_zg = np.empty(cap)
+    zs_zd = np.empty(cap)
+    zs_gg = np.empty(cap)
+    zs_dd = np.empty(cap)
+    k = 0
+
+    i = 0
+    while i < n - 2:
+        # 与内置 max/min 一致：仅当后者严格更大/更小时取后者
+        zg = bi_high[i]
+        gg = bi_high[i]
+        zd = bi_low[i]
+        dd = bi_low[i]
+        for m in range(i + 1, i + 3):
+            high = bi_high[m]
+            low = bi_low[m]
+            if high < zg:
+                zg = high
+            if high > gg:
+                gg = high
+            if low > zd:
+                zd = low
+            if low < dd:
+                dd = low
+
+        if not zg > zd:
+            i += 1
+            continue
+
+        j = i + 3
+        while j < n:
+            high = bi_high[j]
+            low = bi_low[j]
+            new_zg = high if high < zg else zg
+            new_zd = low if low > zd else zd
+            if not new_zg > new_zd:
+                break
+            zg = new_zg
+            zd = new_zd
+            if high > gg:
+                gg = high
+            if low < dd:
+                dd = low
+            j += 1
+
+        zs_start[k] = i
+        zs_end[k] = j
+        zs_zg[k] = zg
+        zs_zd[k] = zd
+        zs_gg[k] = gg
+        zs_dd[k] = dd
+        k += 1
+        i = j
+
+    return zs_start[:k], zs_end[:k], zs_zg[:k], zs_zd[:k], zs_gg[:k], zs_dd[:k]
+
+
+__all__ = ['macd', 'chan_prescan', 'filter_fenxing', 'scan_zhongshu']
@@ -45,7 +45,8 @@ class Config:
     gemini_model_fallback: str = "gemini-2.5-flash"  # 备选模型
     
     # Gemini API 请求配置（防止 429 限流）
-    gemini_request_delay: float = 2.0  # 请求间隔（秒）
+    gemini_request_delay: float = 2.0  # 请求间隔（秒），未配置 GEMINI_RPM 时用于推算限流速率
+    gemini_rpm: float = 30.0  # 每分钟最大请求数（所有线程共享令牌桶，0 表示不限流）
     gemini_max_retries: int = 5  # 最大重试次数
     gemini_retry_delay: float = 5.0  # 重试基础延时（秒）
     
@@ -54,6 +55,19 @@ class Config:
     openai_base_url: Optional[str] = None  # 如: https://api.openai.com/v1
     openai_model: str = "gpt-4o-mini"  # OpenAI 兼容模型名称
     
+    # AI 分析结果缓存（同一时段内价格/新闻未变化时复用上次结果，避免重复调用 LLM）
+    analysis_cache_enabled: bool = True
+    analysis_cache_ttl: int = 1800  # 盘中缓存有效期（秒），默认 30 分钟
+    analysis_cache_ttl_after_close: int = 14400  # 非交易时段缓存有效期（秒），默认 4 小时
+    
+    # LLM 响应磁盘缓存（跨进程复用：同一交易日相同 prompt 的响应直接读取，存放在数据库目录下）
+    llm_disk_cache_enabled: bool = True
+    llm_disk_cache_ttl: int = 21600  # 有效期（秒），默认 6 小时
+    
+    # 批量分析：batch_analyze 每次请求合并分析的股票数（1 表示逐只分析）
+    # 合并后输出长度随股票数线性增长，需确认模型的最大输出 token 足够
+    analysis_batch_size: int = 1
+    
     # === 搜索引擎配置（支持多 Key 负载均衡）===
     bocha_api_keys: List[str] = field(default_factory=list)  # Bocha API Keys
     tavily_api_keys: List[str] = field(default_factory=list)  # Tavily API Keys
@@ -180,6 +194,14 @@ class Config:
         serpapi_keys_str = os.getenv('SERPAPI_API_KEYS', '')
         serpapi_keys = [k.strip() for k in serpapi_keys_str.split(',') if k.strip()]
         
+        # LLM 限流速率：优先使用 GEMINI_RPM，未配置时按请求间隔推算（2 秒间隔 = 30 次/分钟）
+        gemini_request_delay = float(os.getenv('GEMINI_REQUEST_DELAY', '2.0'))
+        gemini_rpm_str = os.getenv('GEMINI_RPM', '')
+        if gemini_rpm_str.strip():
+            gemini_rpm = float(gemini_rpm_str)
+        else:
+            gemini_rpm = 60.0 / gemini_request_delay if gemini_request_delay > 0 else 0.0
+        
         return cls(
             stock_list=stock_list,
             feishu_app_id=os.getenv('FEISHU_APP_ID'),
@@ -189,12 +211,19 @@ class Config:
             gemini_api_key=os.getenv('GEMINI_API_KEY'),
             gemini_model=os.getenv('GEMINI_MODEL', 'gemini-3-flash-preview'),
             gemini_model_fallback=os.getenv('GEMINI_MODEL_FALLBACK', 'gemini-2.5-flash'),
-            gemini_request_delay=float(os.getenv('GEMINI_REQUEST_DELAY', '2.0')),
+            gemini_request_delay=gemini_request_delay,
+            gemini_rpm=gemini_rpm,
             gemini_max_retries=int(os.getenv('GEMINI_MAX_RETRIES', '5')),
             gemini_retry_delay=float(os.getenv('GEMINI_RETRY_DELAY', '5.0')),
             openai_api_key=os.getenv('OPENAI_API_KEY'),
             openai_base_url=os.getenv('OPENAI_BASE_URL'),
             openai_model=os.getenv('OPENAI_MODEL', 'gpt-4o-mini'),
+            analysis_cache_enabled=os.getenv('ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true',
+            analysis_cache_ttl=int(os.getenv('ANALYSIS_CACHE_TTL', '1800')),
+            analysis_cache_ttl_after_close=int(os.getenv('ANALYSIS_CACHE_TTL_AFTER_CLOSE', '14400')),
+            llm_disk_cache_enabled=os.getenv('LLM_DISK_CACHE_ENABLED', 'true').lower() == 'true',
+            llm_disk_cache_ttl=int(os.getenv('LLM_DISK_CACHE_TTL', '21600')),
+            analysis_batch_size=int(os.getenv('ANALYSIS_BATCH_SIZE', '1')),
             bocha_api_keys=bocha_api_keys,
             tavily_api_keys=tavily_api_keys,
             serpapi_keys=serpapi_keys,
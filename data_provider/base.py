@@ -70,6 +70,15 @@ class BaseFetcher(ABC):
     name: str = "BaseFetcher"
     priority: int = 99  # 优先级数字越小越优先
     
+    def is_available(self) -> bool:
+        """
+        检查数据源是否可用（默认始终可用）
+        
+        需要初始化的数据源覆盖此方法，在其中按冷却时间重试初始化并调整自身优先级；
+        DataFetcherManager 每次获取数据前调用，实现应足够廉价
+        """
+        return True
+    
     @abstractmethod
     def _fetch_raw_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
@@ -334,7 +343,11 @@ class DataFetcherManager:
         """
         errors = []
         
+        # 先让各数据源检查自身状态（如 Tushare 冷却期满后重新初始化，成功后恢复最高优先级），
+        # 再按当前优先级排序；不可用的数据源仍保留在末尾兜底
         for fetcher in self._fetchers:
+            fetcher.is_available()
+        for fetcher in sorted(self._fetchers, key=lambda f: f.priority):
             try:
                 logger.info(f"尝试使用 [{fetcher.name}] 获取 {stock_code}...")
                 df = fetcher.get_daily_data(
@@ -9,16 +9,24 @@ TushareFetcher - 备用数据源 1 (Priority 2)
 优点：数据质量高、接口稳定
 
 流控策略：
-1. 实现"每分钟调用计数器"
-2. 超过免费配额（80次/分）时，强制休眠到下一分钟
+1. 按每分钟配额（免费用户 80 次/分）匀速发放请求的令牌桶，线程安全
+2. 令牌不足时只等待到下一个令牌可用，不再整批用完后休眠到下一分钟
 3. 使用 tenacity 实现指数退避重试
 """
 
+import functools
 import logging
+import os
+import pickle
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Tuple
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 from tenacity import (
     retry,
@@ -30,9 +38,62 @@ from tenacity import (
 
 from .base import BaseFetcher, DataFetchError, RateLimitError, STANDARD_COLUMNS
 from config import get_config
+from rate_limiter import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+# 按代码前3位判断市场
+# 沪市：600xxx, 601xxx, 603xxx, 688xxx (科创板)
+# 深市：000xxx, 002xxx, 300xxx (创业板)
+_SH_PREFIXES = ('600', '601', '603', '688')
+_SZ_PREFIXES = ('000', '002', '300')
+
+# API 初始化失败后的重试冷却：60 秒起按失败次数翻倍，最长 1 小时
+_INIT_RETRY_BASE = 60.0
+_INIT_RETRY_MAX = 3600.0
+
+# 批量查询股票名称时每次 stock_basic 请求携带的代码数量上限
+_NAME_QUERY_BATCH = 500
+
+# daily 接口请求的字段：_normalize_data 输出所需的列
+_DAILY_FIELDS = 'trade_date,open,high,low,close,vol,amount,pct_chg'
+
+# 全市场股票名称表的磁盘缓存有效期：上市列表一天内基本不变，
+# 缓存命中时既不消耗 stock_basic 的调用配额，也省去逐行解析
+_STOCK_NAMES_CACHE_TTL = 24 * 3600
+
+
+def _stock_names_cache_path() -> Path:
+    """股票名称缓存文件路径（与数据库文件放在同一目录）"""
+    return Path(get_config().database_path).parent / 'tushare_stock_names.pkl'
+
+
+def _load_stock_names_cache(path: Path) -> dict:
+    """读取未过期的股票名称缓存，文件不存在、已过期或损坏时返回空字典"""
+    try:
+        if time.time() - path.stat().st_mtime >= _STOCK_NAMES_CACHE_TTL:
+            return {}
+        with path.open('rb') as f:
+            names = pickle.load(f)
+        return names if isinstance(names, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.debug(f"[Tushare] 读取股票名称缓存失败: {e}")
+        return {}
+
+
+def _save_stock_names_cache(path: Path, names: dict) -> None:
+    """写入股票名称缓存（先写临时文件再替换，避免并发进程读到半个文件）"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open('wb') as f:
+            pickle.dump(names, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.debug(f"[Tushare] 写入股票名称缓存失败: {e}")
+
 
 class TushareFetcher(BaseFetcher):
     """
@@ -42,8 +103,7 @@ class TushareFetcher(BaseFetcher):
     数据来源：Tushare Pro API
     
     关键策略：
-    - 每分钟调用计数器，防止超出配额
-    - 超过 80 次/分钟时强制等待
+    - 令牌桶按配额匀速放行请求，防止超出配额（多线程共享同一个桶）
     - 失败后指数退避重试
     
     配额说明（Tushare 免费用户）：
@@ -62,9 +122,13 @@ class TushareFetcher(BaseFetcher):
             rate_limit_per_minute: 每分钟最大请求数（默认80，Tushare免费配额）
         """
         self.rate_limit_per_minute = rate_limit_per_minute
-        self._call_count = 0  # 当前分钟内的调用次数
-        self._minute_start: Optional[float] = None  # 当前计数周期开始时间
+        # 容量为 1：请求按 60/rate 秒的间隔匀速发出，不会出现整分钟的突发后长时间休眠
+        self._rate_limiter = TokenBucket(rate_per_minute=rate_limit_per_minute, capacity=1)
         self._api: Optional[object] = None  # Tushare API 实例
+        self._all_names_cache: Optional[dict] = None  # 全市场股票名称表，首次查询名称时加载
+        self._init_lock = threading.Lock()
+        self._init_failures = 0  # 连续初始化失败次数
+        self._last_init_attempt = 0.0  # 最近一次初始化时间（monotonic）
 
         # 尝试初始化 API
         self._init_api()
@@ -76,7 +140,8 @@ class TushareFetcher(BaseFetcher):
         """
         初始化 Tushare API
         
-        如果 Token 未配置，此数据源将不可用
+        如果 Token 未配置，此数据源将不可用；初始化失败时记录失败次数，
+        由 _ensure_api 在冷却期后重试
         """
         config = get_config()
         
@@ -84,6 +149,7 @@ class TushareFetcher(BaseFetcher):
             logger.warning("Tushare Token 未配置，此数据源不可用")
             return
         
+        self._last_init_attempt = time.monotonic()
         try:
             import tushare as ts
             
@@ -94,10 +160,43 @@ class TushareFetcher(BaseFetcher):
             self._api = ts.pro_api()
             
             logger.info("Tushare API 初始化成功")
+            self._init_failures = 0
             
         except Exception as e:
             logger.error(f"Tushare API 初始化失败: {e}")
             self._api = None
+            self._init_failures += 1
+    
+    def _ensure_api(self) -> bool:
+        """
+        确保 API 可用（熔断后自动恢复）
+        
+        API 未初始化且已配置 Token 时，距上次尝试超过冷却时间
+        （60 秒 × 2^失败次数，最长 1 小时）则重新初始化，成功后恢复最高优先级；
+        冷却期内直接返回 False，不重复发起初始化
+        
+        Returns:
+            API 是否可用
+        """
+        if self._api is not None:
+            return True
+        
+        with self._init_lock:
+            if self._api is not None:
+                return True
+            if not get_config().tushare_token:
+                return False
+            
+            cooldown = min(_INIT_RETRY_BASE * 2 ** self._init_failures, _INIT_RETRY_MAX)
+            if time.monotonic() - self._last_init_attempt < cooldown:
+                return False
+            
+            logger.info(f"Tushare API 不可用，重新初始化（此前连续失败 {self._init_failures} 次）")
+            self._init_api()
+            if self._api is None:
+                return False
+            self.priority = self._determine_priority()
+            return True
 
     def _determine_priority(self) -> int:
         """
@@ -126,53 +225,24 @@ class TushareFetcher(BaseFetcher):
         检查数据源是否可用
 
         Returns:
-            True 表示可用，False 表示不可用
+            True 表示可用，False 表示不可用（初始化失败时按冷却时间自动重试）
         """
-        return self._api is not None
+        return self._ensure_api()
 
     def _check_rate_limit(self) -> None:
         """
         检查并执行速率限制
         
-        流控策略：
-        1. 检查是否进入新的一分钟
-        2. 如果是，重置计数器
-        3. 如果当前分钟调用次数超过限制，强制休眠
+        从共享令牌桶取一个令牌，不足时阻塞到下一个令牌可用；
+        令牌桶基于 time.monotonic() 且自带锁，系统时钟调整和多线程并发调用都不影响配额
         """
-        current_time = time.time()
-        
-        # 检查是否需要重置计数器（新的一分钟）
-        if self._minute_start is None:
-            self._minute_start = current_time
-            self._call_count = 0
-        elif current_time - self._minute_start >= 60:
-            # 已经过了一分钟，重置计数器
-            self._minute_start = current_time
-            self._call_count = 0
-            logger.debug("速率限制计数器已重置")
-        
-        # 检查是否超过配额
-        if self._call_count >= self.rate_limit_per_minute:
-            # 计算需要等待的时间（到下一分钟）
-            elapsed = current_time - self._minute_start
-            sleep_time = max(0, 60 - elapsed) + 1  # +1 秒缓冲
-            
-            logger.warning(
-                f"Tushare 达到速率限制 ({self._call_count}/{self.rate_limit_per_minute} 次/分钟)，"
-                f"等待 {sleep_time:.1f} 秒..."
-            )
-            
-            time.sleep(sleep_time)
-            
-            # 重置计数器
-            self._minute_start = time.time()
-            self._call_count = 0
-        
-        # 增加调用计数
-        self._call_count += 1
-        logger.debug(f"Tushare 当前分钟调用次数: {self._call_count}/{self.rate_limit_per_minute}")
+        waited = self._rate_limiter.acquire()
+        if waited > 0:
+            logger.debug(f"Tushare 限流等待 {waited:.1f} 秒")
     
-    def _convert_stock_code(self, stock_code: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=8192)
+    def _convert_stock_code(stock_code: str) -> str:
         """
         转换股票代码为 Tushare 格式
         
@@ -180,6 +250,8 @@ class TushareFetcher(BaseFetcher):
         - 沪市：600519.SH
         - 深市：000001.SZ
         
+        纯字符串变换，按输入缓存：批量处理时同一代码只判断一次（无法确定市场的警告也只记一次）
+        
         Args:
             stock_code: 原始代码，如 '600519', '000001'
             
@@ -193,17 +265,51 @@ class TushareFetcher(BaseFetcher):
             return code.upper()
         
         # 根据代码前缀判断市场
-        # 沪市：600xxx, 601xxx, 603xxx, 688xxx (科创板)
-        # 深市：000xxx, 002xxx, 300xxx (创业板)
-        if code.startswith(('600', '601', '603', '688')):
+        if code.startswith(_SH_PREFIXES):
             return f"{code}.SH"
-        elif code.startswith(('000', '002', '300')):
+        elif code.startswith(_SZ_PREFIXES):
             return f"{code}.SZ"
         else:
             # 默认尝试深市
             logger.warning(f"无法确定股票 {code} 的市场，默认使用深市")
             return f"{code}.SZ"
     
+    def _convert_stock_codes(self, stock_codes: Sequence[str]) -> List[str]:
+        """
+        批量转换股票代码为 Tushare 格式
+        
+        规则与 _convert_stock_code 相同，但整批代码在 NumPy 字符串数组上一次完成
+        前缀判断和拼接；无法确定市场的代码汇总为一条警告
+        
+        Args:
+            stock_codes: 原始代码列表，如 ['600519', '000001']
+            
+        Returns:
+            与输入顺序一致的 Tushare 格式代码列表
+        """
+        if len(stock_codes) == 0:
+            return []
+        
+        codes = np.char.strip(np.asarray(stock_codes, dtype=str))
+        has_suffix = np.char.find(codes, '.') >= 0
+        prefix = codes.astype('U3')  # 转为定长3字符即截取前3位
+        is_sh = np.isin(prefix, _SH_PREFIXES)
+        
+        converted = np.where(
+            has_suffix,
+            np.char.upper(codes),
+            np.char.add(codes, np.where(is_sh, '.SH', '.SZ')),
+        )
+        
+        unknown = ~(has_suffix | is_sh | np.isin(prefix, _SZ_PREFIXES))
+        if unknown.any():
+            # 默认尝试深市
+            logger.warning(
+                f"无法确定 {int(unknown.sum())} 只股票的市场，默认使用深市: {codes[unknown][:10].tolist()}"
+            )
+        
+        return converted.tolist()
+    
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
@@ -222,7 +328,7 @@ class TushareFetcher(BaseFetcher):
         3. 转换股票代码格式
         4. 调用 API 获取数据
         """
-        if self._api is None:
+        if not self._ensure_api():
             raise DataFetchError("Tushare API 未初始化，请检查 Token 配置")
         
         # 速率限制检查
@@ -235,14 +341,16 @@ class TushareFetcher(BaseFetcher):
         ts_start = start_date.replace('-', '')
         ts_end = end_date.replace('-', '')
         
-        logger.debug(f"调用 Tushare daily({ts_code}, {ts_start}, {ts_end})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"调用 Tushare daily({ts_code}, {ts_start}, {ts_end})")
         
         try:
-            # 调用 daily 接口获取日线数据
+            # 调用 daily 接口获取日线数据，只请求标准化用得到的列（不取 ts_code/pre_close/change）
             df = self._api.daily(
                 ts_code=ts_code,
                 start_date=ts_start,
                 end_date=ts_end,
+                fields=_DAILY_FIELDS,
             )
             
             return df
@@ -266,9 +374,9 @@ class TushareFetcher(BaseFetcher):
         
         需要映射到标准列名：
         date, open, high, low, close, volume, amount, pct_chg
-        """
-        df = df.copy()
         
+        df 是 _fetch_raw_data 刚返回的接口结果，调用方不再使用，直接原地修改，不先整表复制
+        """
         # 列名映射
         column_mapping = {
             'trade_date': 'date',
@@ -276,19 +384,19 @@ class TushareFetcher(BaseFetcher):
             # open, high, low, close, amount, pct_chg 列名相同
         }
         
-        df = df.rename(columns=column_mapping)
+        df.rename(columns=column_mapping, inplace=True)
         
-        # 转换日期格式（YYYYMMDD -> YYYY-MM-DD）
+        # 转换日期格式（YYYYMMDD -> YYYY-MM-DD），传入数组跳过索引对齐
         if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'], format='%Y%m%d')
+            df['date'] = pd.to_datetime(df['date'].to_numpy(), format='%Y%m%d')
         
         # 成交量单位转换（Tushare 的 vol 单位是手，需要转换为股）
         if 'volume' in df.columns:
-            df['volume'] = df['volume'] * 100
+            df['volume'] *= 100
         
         # 成交额单位转换（Tushare 的 amount 单位是千元，转换为元）
         if 'amount' in df.columns:
-            df['amount'] = df['amount'] * 1000
+            df['amount'] *= 1000
         
         # 添加股票代码列
         df['code'] = stock_code
@@ -300,11 +408,55 @@ class TushareFetcher(BaseFetcher):
         
         return df
 
+    def bulk_fetch(
+        self,
+        stock_codes: Sequence[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        days: int = 30,
+        max_workers: int = 8,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        并发获取多只股票的日线数据
+        
+        每只股票走一遍 get_daily_data；所有线程共享同一个令牌桶（_check_rate_limit），
+        总请求速率仍不超过 rate_limit_per_minute，但各请求的网络等待相互重叠，
+        串行调用时达不到的每分钟配额可以用满
+        
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 开始日期（可选）
+            end_date: 结束日期（可选，默认今天）
+            days: 获取天数（当 start_date 未指定时使用）
+            max_workers: 并发线程数
+            
+        Returns:
+            字典 {股票代码: 标准化的 DataFrame}，顺序与输入一致；获取失败的股票不包含在内
+        """
+        if not stock_codes:
+            return {}
+        
+        def fetch_one(stock_code: str) -> Optional[pd.DataFrame]:
+            try:
+                return self.get_daily_data(stock_code, start_date=start_date, end_date=end_date, days=days)
+            except DataFetchError:
+                # get_daily_data 已记录错误日志
+                return None
+        
+        workers = max(1, min(max_workers, len(stock_codes)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tushare-fetch') as executor:
+            frames = list(executor.map(fetch_one, stock_codes))
+        
+        result = {code: df for code, df in zip(stock_codes, frames) if df is not None}
+        logger.info(f"[Tushare] 批量获取完成: 成功 {len(result)}/{len(stock_codes)} 只")
+        return result
+
     def get_stock_name(self, stock_code: str) -> str:
         """
         获取股票名称
         
-        使用 Tushare stock_basic 接口获取股票基本信息
+        优先查全市场名称表（get_all_stock_names，带本地缓存，进程内只加载一次），
+        表中没有时才用 stock_basic 精确查询单只股票
         
         Args:
             stock_code: 股票代码（6位数字）
@@ -312,12 +464,20 @@ class TushareFetcher(BaseFetcher):
         Returns:
             股票名称，获取失败返回空字符串
         """
+        if self._all_names_cache is None:
+            self._all_names_cache = self.get_all_stock_names()
+        
+        code = stock_code.strip()
+        name = self._all_names_cache.get(code)
+        if name:
+            return name
+        
         if not self._api:
             return ''
         
         try:
             # 转换代码格式（000001 -> 000001.SZ 或 600519 -> 600519.SH）
-            ts_code = self._convert_to_tushare_code(stock_code)
+            ts_code = self._convert_stock_code(code)
             
             # 查询股票基本信息
             df = self._api.stock_basic(
@@ -329,32 +489,81 @@ class TushareFetcher(BaseFetcher):
                 name = df.iloc[0].get('name', '')
                 if name:
                     logger.debug(f"[Tushare] 获取股票名称成功: {stock_code} -> {name}")
+                    self._all_names_cache[code] = str(name)
                     return str(name)
             
-            # 如果精确匹配失败，尝试模糊匹配
-            df = self._api.stock_basic(fields='ts_code,name')
-            if df is not None and not df.empty:
-                # 查找匹配的股票代码
-                match = df[df['ts_code'].str.startswith(stock_code)]
-                if not match.empty:
-                    name = match.iloc[0].get('name', '')
-                    if name:
-                        logger.debug(f"[Tushare] 模糊匹配股票名称: {stock_code} -> {name}")
-                        return str(name)
-            
             return ''
             
         except Exception as e:
             logger.debug(f"[Tushare] 获取股票名称失败 {stock_code}: {e}")
             return ''
 
+    def get_stock_names(self, stock_codes: Sequence[str]) -> Dict[str, str]:
+        """
+        批量获取股票名称
+        
+        先查全市场名称表；表中没有的代码按每批最多 500 个合并成一次
+        stock_basic(ts_code='a,b,...') 查询，而不是每只股票单独请求一次
+        
+        Args:
+            stock_codes: 股票代码列表（6位数字）
+            
+        Returns:
+            字典 {股票代码: 股票名称}，获取失败的代码不包含在内
+        """
+        if self._all_names_cache is None:
+            self._all_names_cache = self.get_all_stock_names()
+        
+        names = {}
+        missing = []
+        for stock_code in stock_codes:
+            code = stock_code.strip()
+            name = self._all_names_cache.get(code)
+            if name:
+                names[code] = name
+            else:
+                missing.append(code)
+        
+        if not missing or not self._api:
+            return names
+        
+        ts_codes = self._convert_stock_codes(missing)
+        for start in range(0, len(ts_codes), _NAME_QUERY_BATCH):
+            batch = ts_codes[start:start + _NAME_QUERY_BATCH]
+            try:
+                self._check_rate_limit()
+                df = self._api.stock_basic(ts_code=','.join(batch), fields='ts_code,name')
+            except Exception as e:
+                logger.debug(f"[Tushare] 批量获取股票名称失败（{len(batch)} 只）: {e}")
+                continue
+            
+            if df is None or df.empty:
+                continue
+            # 按返回的 ts_code 对应回6位代码，接口返回顺序或数量与请求不一致时也不会错配
+            df = df.dropna(subset=['ts_code', 'name'])
+            for ts_code, name in zip(df['ts_code'].tolist(), df['name'].tolist()):
+                if ts_code and name:
+                    code = ts_code.split('.', 1)[0]
+                    names[code] = self._all_names_cache[code] = str(name)
+        
+        logger.debug(f"[Tushare] 批量获取股票名称: {len(names)}/{len(stock_codes)} 只")
+        return names
+
     def get_all_stock_names(self) -> dict:
         """
         获取所有股票的名称映射表
         
+        结果在本地缓存 24 小时，有效期内直接读取缓存，不再请求 API
+        
         Returns:
             字典 {股票代码: 股票名称}
         """
+        cache_path = _stock_names_cache_path()
+        cached = _load_stock_names_cache(cache_path)
+        if cached:
+            logger.debug(f"[Tushare] 从本地缓存读取 {len(cached)} 只股票名称")
+            return cached
+        
         if not self._api:
             return {}
         
@@ -366,17 +575,18 @@ class TushareFetcher(BaseFetcher):
             )
             
             if df is not None and not df.empty:
-                # 转换为字典 {代码: 名称}
-                result = {}
-                for _, row in df.iterrows():
-                    ts_code = row.get('ts_code', '')
-                    name = row.get('name', '')
-                    if ts_code and name:
-                        # 提取6位数字代码
-                        code = ts_code.split('.')[0]
-                        result[code] = name
+                # 转换为字典 {代码: 名称}，ts_code 取6位数字代码部分
+                # 两列各取出一次为列表后直接 zip，避免 iterrows 为每一行构造 Series
+                df = df.dropna(subset=['ts_code', 'name'])
+                result = {
+                    ts_code.split('.', 1)[0]: name
+                    for ts_code, name in zip(df['ts_code'].tolist(), df['name'].tolist())
+                    if ts_code and name
+                }
                 
                 logger.info(f"[Tushare] 获取 {len(result)} 只股票名称")
+                if result:
+                    _save_stock_names_cache(cache_path, result)
                 return result
             
             return {}
@@ -386,9 +596,61 @@ class TushareFetcher(BaseFetcher):
             return {}
 
 
-# 缓存所有股票名称（避免重复请求）
-_stock_name_cache: dict = {}
-_stock_name_cache_time: float = 0
+# 缓存股票名称（避免重复请求）：{代码: (名称, 过期时间)}，按最近使用排序
+# 每条记录单独过期（1小时），不会在整点把整个缓存清空后集中重新请求；超过容量时淘汰最久未用的记录
+_STOCK_NAME_CACHE_TTL = 3600
+_STOCK_NAME_CACHE_MAXSIZE = 10000
+_stock_name_cache: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+_stock_name_cache_lock = threading.Lock()
+
+
+def _get_cached_stock_name(stock_code: str) -> Optional[str]:
+    """读取未过期的缓存名称，过期记录顺带删除"""
+    with _stock_name_cache_lock:
+        entry = _stock_name_cache.get(stock_code)
+        if entry is None:
+            return None
+        name, expiry = entry
+        if expiry < time.monotonic():
+            del _stock_name_cache[stock_code]
+            return None
+        _stock_name_cache.move_to_end(stock_code)
+        return name
+
+
+def _put_cached_stock_name(stock_code: str, name: str) -> None:
+    """写入缓存名称，超过容量时淘汰最久未用的记录"""
+    with _stock_name_cache_lock:
+        _stock_name_cache[stock_code] = (name, time.monotonic() + _STOCK_NAME_CACHE_TTL)
+        _stock_name_cache.move_to_end(stock_code)
+        while len(_stock_name_cache) > _STOCK_NAME_CACHE_MAXSIZE:
+            _stock_name_cache.popitem(last=False)
+
+
+# 进程级共享的 Tushare API 实例（按 token 缓存）：
+# get_stock_name_from_tushare 不再每次调用都 import tushare、写 token、新建 pro_api
+_shared_api_lock = threading.Lock()
+_shared_apis: Dict[str, Any] = {}
+
+
+def _get_shared_api() -> Optional[Any]:
+    """获取共享的 Tushare API 实例，未配置 token 或初始化失败时返回 None"""
+    try:
+        token = get_config().tushare_token
+        if not token:
+            return None
+        
+        with _shared_api_lock:
+            api = _shared_apis.get(token)
+            if api is None:
+                import tushare as ts
+                ts.set_token(token)
+                api = ts.pro_api()
+                _shared_apis[token] = api
+            return api
+    except Exception as e:
+        logger.debug(f"Tushare API 初始化失败: {e}")
+        return None
 
 
 def get_stock_name_from_tushare(stock_code: str, api=None) -> str:
@@ -402,28 +664,14 @@ def get_stock_name_from_tushare(stock_code: str, api=None) -> str:
     Returns:
         股票名称
     """
-    global _stock_name_cache, _stock_name_cache_time
-    
-    # 检查缓存是否有效（1小时过期）
-    current_time = time.time()
-    if current_time - _stock_name_cache_time > 3600:
-        _stock_name_cache = {}
-        _stock_name_cache_time = current_time
+    # 从缓存获取（每条记录1小时过期）
+    name = _get_cached_stock_name(stock_code)
+    if name is not None:
+        return name
     
-    # 从缓存获取
-    if stock_code in _stock_name_cache:
-        return _stock_name_cache[stock_code]
-    
-    # 如果没有 API，创建一个
+    # 如果没有 API，使用进程内共享的实例
     if api is None:
-        try:
-            config = get_config()
-            if config.tushare_token:
-                import tushare as ts
-                ts.set_token(config.tushare_token)
-                api = ts.pro_api()
-        except:
-            return ''
+        api = _get_shared_api()
     
     if api is None:
         return ''
@@ -443,7 +691,7 @@ def get_stock_name_from_tushare(stock_code: str, api=None) -> str:
         if df is not None and not df.empty:
             name = str(df.iloc[0].get('name', ''))
             if name:
-                _stock_name_cache[stock_code] = name
+                _put_cached_stock_name(stock_code, name)
                 return name
         
         return ''
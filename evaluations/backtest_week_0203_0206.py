@@ -6,8 +6,17 @@
 """
 
 import json
+import os
+import sys
 from datetime import datetime
 
+import numpy as np
+
+# 仓库根目录（numba_compat 所在位置），按脚本路径定位，从任意目录运行均可
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from numba_compat import njit
+
 # 实盘数据
 prices = {
     "300751": {  # 迈为股份
@@ -50,8 +59,81 @@ predictions = {
     },
 }
 
+# 价格展开为 (日期, 股票) 二维数组，交易模拟和准确性分析共用
+PRICE_CODES = list(prices)
+PRICE_DATES = sorted({d for code_prices in prices.values() for d in code_prices})
+CODE_INDEX = {code: j for j, code in enumerate(PRICE_CODES)}
+DATE_INDEX = {d: i for i, d in enumerate(PRICE_DATES)}
+PRICE_MATRIX = np.array([[prices[code].get(d, np.nan) for code in PRICE_CODES] for d in PRICE_DATES])
+
+# 前一个有价日的收盘价：停牌日沿用最近收盘价，再整体下移一行
+_filled = PRICE_MATRIX.copy()
+for _i in range(1, len(PRICE_DATES)):
+    _filled[_i] = np.where(np.isnan(_filled[_i]), _filled[_i - 1], _filled[_i])
+PREV_CLOSE_MATRIX = np.vstack([np.full(len(PRICE_CODES), np.nan), _filled[:-1]])
+del _filled, _i
+
+# 每日涨跌幅 (%)，相对前一个有价日收盘（复牌日按停牌前收盘计算）
+PCT_CHANGE = (PRICE_MATRIX - PREV_CLOSE_MATRIX) / PREV_CLOSE_MATRIX * 100
+
+# 交易动作编码（hold 及未知动作均视为持仓不变）
+ACTION_HOLD, ACTION_BUY, ACTION_SELL, ACTION_REDUCE = 0, 1, 2, 3
+_ACTION_CODES = {"hold": ACTION_HOLD, "buy": ACTION_BUY, "sell": ACTION_SELL, "reduce": ACTION_REDUCE}
+
+
+@njit(cache=True)
+def _trade_kernel(rows, action, target, price, prev_close):
+    """
+    逐日逐股更新持仓
+    
+    Args:
+        rows: 每个交易日在价格数组中的行号，无价格数据的交易日为 -1（整日跳过）
+        action / target: (交易日, 股票) 的动作编码和目标股数
+        price / prev_close: (价格日, 股票) 的当日价格和前一有价日收盘价，NaN 表示停牌
+    
+    Returns:
+        (shares_before, delta, pnl, shares, avg_cost)：每日操作前持仓、成交股数（卖出为负）、
+        已实现盈亏，以及期末持仓和成本价。低于目标仓位才买入、高于目标仓位才卖出/减仓，
+        买入按前收盘价重置成本
+    """
+    n_days, n_codes = target.shape
+    shares_before = np.zeros((n_days, n_codes), dtype=np.int64)
+    delta = np.zeros((n_days, n_codes), dtype=np.int64)
+    pnl = np.zeros((n_days, n_codes))
+    shares = np.zeros(n_codes, dtype=np.int64)
+    avg_cost = np.zeros(n_codes)
+    
+    for t in range(n_days):
+        r = rows[t]
+        if r < 0:
+            continue
+        for j in range(n_codes):
+            cur = shares[j]
+            shares_before[t, j] = cur
+            close = prev_close[r, j]
+            if np.isnan(price[r, j]) or np.isnan(close):
+                continue
+            act = action[t, j]
+            tgt = target[t, j]
+            if act == ACTION_BUY and cur < tgt:
+                delta[t, j] = tgt - cur
+                shares[j] = tgt
+                avg_cost[j] = close
+            elif (act == ACTION_SELL or act == ACTION_REDUCE) and cur > tgt:
+                delta[t, j] = tgt - cur
+                if avg_cost[j] > 0:
+                    pnl[t, j] = (close - avg_cost[j]) * (cur - tgt)
+                shares[j] = tgt
+    
+    return shares_before, delta, pnl, shares, avg_cost
+
 def simulate_trades():
-    """模拟交易"""
+    """
+    模拟交易
+    
+    价格和目标仓位展开为 (日期, 股票) 数组，每个交易日对所有股票整列判断买卖并更新持仓，
+    最后按交易计划顺序输出明细
+    """
     
     # 初始状态：假设2/2收盘时空仓
     positions = {
@@ -95,61 +177,87 @@ def simulate_trades():
         },
     ]
     
+    # 交易计划展开为 (日期, 股票) 二维数组，逐日的仓位更新对所有股票整列计算
+    code_index = CODE_INDEX
+    date_index = DATE_INDEX
+    n_codes = len(PRICE_CODES)
+    price_arr = PRICE_MATRIX
+    # 使用前一日收盘价模拟 (简化)
+    prev_close_arr = PREV_CLOSE_MATRIX
+    
+    n_days = len(trades)
+    action_arr = np.full((n_days, n_codes), ACTION_HOLD, dtype=np.int8)
+    target_pos_arr = np.zeros((n_days, n_codes))
+    for t, day_trades in enumerate(trades):
+        for act in day_trades["actions"]:
+            j = code_index[act["code"]]
+            action_arr[t, j] = _ACTION_CODES.get(act["action"], ACTION_HOLD)
+            target_pos_arr[t, j] = act.get("target_pos", 0)
+    target_shares_arr = (base_shares * target_pos_arr).astype(np.int64)
+    
+    # 逐日更新持仓，记录每日操作前持仓、成交股数和已实现盈亏
+    trade_rows = np.array([date_index.get(day_trades["date"], -1) for day_trades in trades], dtype=np.int64)
+    shares_before, delta_arr, pnl_arr, shares, avg_cost = _trade_kernel(
+        trade_rows, action_arr, target_shares_arr, price_arr, prev_close_arr,
+    )
+    
+    for code, j in code_index.items():
+        positions[code]["shares"] = int(shares[j])
+        positions[code]["avg_cost"] = float(avg_cost[j])
+    
+    # 按交易计划的原顺序输出成交明细
     pnl_details = []
+    out = []  # 每日明细先收集，整块写出一次
     
-    for day_trades in trades:
+    for t, day_trades in enumerate(trades):
         date = day_trades["date"]
-        print(f"\n{'='*50}")
-        print(f"📅 {date} 交易执行")
-        print('='*50)
+        row = date_index.get(date)
+        out.append(f"\n{'='*50}")
+        out.append(f"📅 {date} 交易执行")
+        out.append('='*50)
+        
+        # 当日各数组行只取一次，循环内按列下标读取
+        if row is not None:
+            day_prices = price_arr[row]
+            day_prev_close = prev_close_arr[row]
+        day_delta = delta_arr[t]
+        day_pnl = pnl_arr[t]
+        day_action = action_arr[t]
+        day_shares = shares_before[t]
         
         for act in day_trades["actions"]:
             code = act["code"]
-            action = act["action"]
+            j = code_index[code]
             
             # 获取当日开盘价 (实际交易价)
-            if date not in prices.get(code, {}):
-                print(f"  {code}: 停牌，跳过")
+            if row is None or np.isnan(day_prices[j]):
+                out.append(f"  {code}: 停牌，跳过")
                 continue
-                
-            # 使用前一日收盘价模拟 (简化)
-            prev_dates = sorted([d for d in prices[code].keys() if d < date])
-            if not prev_dates:
+            prev_close = float(day_prev_close[j])
+            if np.isnan(prev_close):
                 continue
-            prev_close = prices[code][prev_dates[-1]]
-            today_close = prices[code][date]
             
-            current_shares = positions[code]["shares"]
-            target_shares = int(base_shares * act.get("target_pos", 0))
-            
-            if action == "buy" and current_shares < target_shares:
-                buy_shares = target_shares - current_shares
-                buy_cost = buy_shares * prev_close
-                positions[code]["shares"] = target_shares
-                positions[code]["avg_cost"] = prev_close
-                print(f"  🟢 {code} 买入 {buy_shares}股 @ {prev_close:.2f} = ¥{buy_cost:,.0f}")
-                trade_log.append({"date": date, "code": code, "action": "买入", "shares": buy_shares, "price": prev_close})
-                
-            elif action == "sell" and current_shares > target_shares:
-                sell_shares = current_shares - target_shares
+            delta = int(day_delta[j])
+            if delta > 0:
+                buy_cost = delta * prev_close
+                out.append(f"  🟢 {code} 买入 {delta}股 @ {prev_close:.2f} = ¥{buy_cost:,.0f}")
+                trade_log.append({"date": date, "code": code, "action": "买入", "shares": delta, "price": prev_close})
+            elif delta < 0:
+                sell_shares = -delta
                 sell_value = sell_shares * prev_close
-                pnl = (prev_close - positions[code]["avg_cost"]) * sell_shares if positions[code]["avg_cost"] > 0 else 0
-                positions[code]["shares"] = target_shares
-                print(f"  🔴 {code} 卖出 {sell_shares}股 @ {prev_close:.2f} = ¥{sell_value:,.0f} (盈亏: ¥{pnl:+,.0f})")
-                trade_log.append({"date": date, "code": code, "action": "卖出", "shares": sell_shares, "price": prev_close, "pnl": pnl})
+                pnl = float(day_pnl[j])
+                if day_action[j] == ACTION_REDUCE:
+                    icon, label = "🟡", "减仓"
+                else:
+                    icon, label = "🔴", "卖出"
+                out.append(f"  {icon} {code} {label} {sell_shares}股 @ {prev_close:.2f} = ¥{sell_value:,.0f} (盈亏: ¥{pnl:+,.0f})")
+                trade_log.append({"date": date, "code": code, "action": label, "shares": sell_shares, "price": prev_close, "pnl": pnl})
                 pnl_details.append({"code": code, "pnl": pnl})
-                
-            elif action == "reduce" and current_shares > target_shares:
-                sell_shares = current_shares - target_shares
-                sell_value = sell_shares * prev_close
-                pnl = (prev_close - positions[code]["avg_cost"]) * sell_shares if positions[code]["avg_cost"] > 0 else 0
-                positions[code]["shares"] = target_shares
-                print(f"  🟡 {code} 减仓 {sell_shares}股 @ {prev_close:.2f} = ¥{sell_value:,.0f} (盈亏: ¥{pnl:+,.0f})")
-                trade_log.append({"date": date, "code": code, "action": "减仓", "shares": sell_shares, "price": prev_close, "pnl": pnl})
-                pnl_details.append({"code": code, "pnl": pnl})
-                
             else:
-                print(f"  ⚪ {code} 持仓不变 ({current_shares}股)")
+                out.append(f"  ⚪ {code} 持仓不变 ({day_shares[j]}股)")
+        
+        sys.stdout.write("\n".join(out) + "\n")
+        out.clear()
     
     # 计算最终持仓市值 (以2/6收盘价计算)
     print(f"\n{'='*50}")
@@ -159,17 +267,18 @@ def simulate_trades():
     total_value = 0
     total_cost = 0
     for code, pos in positions.items():
-        if pos["shares"] > 0:
-            if "2026-02-06" in prices[code]:
-                close_price = prices[code]["2026-02-06"]
-            else:
-                close_price = list(prices[code].values())[-1]
-            market_value = pos["shares"] * close_price
-            cost_value = pos["shares"] * pos["avg_cost"]
+        held = pos["shares"]
+        if held > 0:
+            code_prices = prices[code]
+            close_price = code_prices.get("2026-02-06")
+            if close_price is None:
+                close_price = list(code_prices.values())[-1]
+            market_value = held * close_price
+            cost_value = held * pos["avg_cost"]
             unrealized_pnl = market_value - cost_value
             total_value += market_value
             total_cost += cost_value
-            print(f"  {code}: {pos['shares']}股 @ {close_price:.2f} = ¥{market_value:,.0f} (浮盈: ¥{unrealized_pnl:+,.0f})")
+            print(f"  {code}: {held}股 @ {close_price:.2f} = ¥{market_value:,.0f} (浮盈: ¥{unrealized_pnl:+,.0f})")
     
     realized_pnl = sum(p["pnl"] for p in pnl_details)
     unrealized_pnl = total_value - total_cost
@@ -190,65 +299,72 @@ def simulate_trades():
         "trade_log": trade_log,
     }
 
+def _pct_change(date: str, code: str) -> float:
+    """date 当日相对前一个有价日的涨跌幅 (%)"""
+    return float(PCT_CHANGE[DATE_INDEX[date], CODE_INDEX[code]])
+
 def analyze_prediction_accuracy():
     """分析预测准确性"""
     
-    print(f"\n{'='*50}")
-    print("🎯 预测准确性分析")
-    print('='*50)
+    out = []  # 逐条结果先收集，统计前一次写出
+    out.append(f"\n{'='*50}")
+    out.append("🎯 预测准确性分析")
+    out.append('='*50)
     
     analysis = []
     
     # 2/3 预测 vs 2/4 实际
-    print("\n📌 2/3 预测 → 2/4 验证:")
+    out.append("\n📌 2/3 预测 → 2/4 验证:")
     
     # 300751: 预测买入 @ 335, 2/4 收盘 328.6 (-1.9%)
     pred = predictions["2026-02-03"]["300751"]
-    actual_change = (prices["300751"]["2026-02-04"] - prices["300751"]["2026-02-03"]) / prices["300751"]["2026-02-03"] * 100
+    actual_change = _pct_change("2026-02-04", "300751")
     result = "❌ 错误" if actual_change < 0 else "✅ 正确"
-    print(f"  300751: 预测{pred['signal']} → 实际{actual_change:+.1f}% {result}")
+    out.append(f"  300751: 预测{pred['signal']} → 实际{actual_change:+.1f}% {result}")
     analysis.append({"date": "2026-02-03", "code": "300751", "pred": pred["signal"], "actual": actual_change, "correct": actual_change > 0})
     
     # 002300: 预测卖出 @ 8.69, 2/4 收盘 9.56 (+10%)
-    actual_change = (prices["002300"]["2026-02-04"] - prices["002300"]["2026-02-03"]) / prices["002300"]["2026-02-03"] * 100
+    actual_change = _pct_change("2026-02-04", "002300")
     result = "✅ 正确" if actual_change < 0 else "❌ 错误"
-    print(f"  002300: 预测卖出 → 实际{actual_change:+.1f}% {result}")
+    out.append(f"  002300: 预测卖出 → 实际{actual_change:+.1f}% {result}")
     analysis.append({"date": "2026-02-03", "code": "002300", "pred": "卖出", "actual": actual_change, "correct": actual_change < 0})
     
     # 2/4 预测 vs 2/5 实际
-    print("\n📌 2/4 预测 → 2/5 验证:")
+    out.append("\n📌 2/4 预测 → 2/5 验证:")
     
     # 300751: 预测观望/减仓, 2/5 收盘 294.21 (-10.5%)
-    actual_change = (prices["300751"]["2026-02-05"] - prices["300751"]["2026-02-04"]) / prices["300751"]["2026-02-04"] * 100
+    actual_change = _pct_change("2026-02-05", "300751")
     result = "✅ 正确 (预判了下跌风险)" if actual_change < 0 else "❌ 错误"
-    print(f"  300751: 预测观望/减仓 → 实际{actual_change:+.1f}% {result}")
+    out.append(f"  300751: 预测观望/减仓 → 实际{actual_change:+.1f}% {result}")
     analysis.append({"date": "2026-02-04", "code": "300751", "pred": "观望/减仓", "actual": actual_change, "correct": True})
     
     # 002300: 预测买入 @ 9.56, 2/5 收盘 9.32 (-2.5%)
-    actual_change = (prices["002300"]["2026-02-05"] - prices["002300"]["2026-02-04"]) / prices["002300"]["2026-02-04"] * 100
+    actual_change = _pct_change("2026-02-05", "002300")
     result = "❌ 错误" if actual_change < 0 else "✅ 正确"
-    print(f"  002300: 预测买入 → 实际{actual_change:+.1f}% {result}")
+    out.append(f"  002300: 预测买入 → 实际{actual_change:+.1f}% {result}")
     analysis.append({"date": "2026-02-04", "code": "002300", "pred": "买入", "actual": actual_change, "correct": actual_change > 0})
     
     # 2/5 预测 vs 2/6 实际
-    print("\n📌 2/5 预测 → 2/6 验证:")
+    out.append("\n📌 2/5 预测 → 2/6 验证:")
     
     # 300751: 预测卖出 @ 294.21, 2/6 收盘 302.15 (+2.7%)
-    actual_change = (prices["300751"]["2026-02-06"] - prices["300751"]["2026-02-05"]) / prices["300751"]["2026-02-05"] * 100
+    actual_change = _pct_change("2026-02-06", "300751")
     result = "✅ 正确" if actual_change < 0 else "❌ 错误 (反弹了)"
-    print(f"  300751: 预测卖出 → 实际{actual_change:+.1f}% {result}")
+    out.append(f"  300751: 预测卖出 → 实际{actual_change:+.1f}% {result}")
     analysis.append({"date": "2026-02-05", "code": "300751", "pred": "卖出", "actual": actual_change, "correct": actual_change < 0})
     
     # 002300: 预测观望
-    actual_change = (prices["002300"]["2026-02-06"] - prices["002300"]["2026-02-05"]) / prices["002300"]["2026-02-05"] * 100
-    print(f"  002300: 预测观望 → 实际{actual_change:+.1f}% ⚪ 观望正确")
+    actual_change = _pct_change("2026-02-06", "002300")
+    out.append(f"  002300: 预测观望 → 实际{actual_change:+.1f}% ⚪ 观望正确")
     
     # 300666: 预测减仓, 复牌涨8.9%
-    actual_change = (prices["300666"]["2026-02-06"] - 113.48) / 113.48 * 100
+    actual_change = _pct_change("2026-02-06", "300666")
     result = "❌ 错误 (复牌大涨)"
-    print(f"  300666: 预测减仓 → 实际{actual_change:+.1f}% {result}")
+    out.append(f"  300666: 预测减仓 → 实际{actual_change:+.1f}% {result}")
     analysis.append({"date": "2026-02-05", "code": "300666", "pred": "减仓", "actual": actual_change, "correct": actual_change < 0})
     
+    sys.stdout.write("\n".join(out) + "\n")
+    
     # 统计准确率
     correct = sum(1 for a in analysis if a["correct"])
     total = len(analysis)
@@ -4,9 +4,13 @@
 对比优化前后的效果
 """
 
+import functools
 import sys
 sys.path.insert(0, '..')
 
+import numpy as np
+
+from optimizer_kernel import SIGNAL_BUY, SIGNAL_HOLD, SIGNAL_SELL
 from signal_optimizer import SignalOptimizer
 
 # 实盘数据
@@ -31,6 +35,26 @@ PRICES = {
     },
 }
 
+# 价格展开为 (日期, 股票) 二维数组，缺失（停牌）为 NaN
+PRICE_CODES = list(PRICES)
+PRICE_DATES = sorted({d for code_prices in PRICES.values() for d in code_prices})
+CODE_INDEX = {code: j for j, code in enumerate(PRICE_CODES)}
+DATE_INDEX = {d: i for i, d in enumerate(PRICE_DATES)}
+PRICE_MATRIX = np.array([[PRICES[code].get(d, np.nan) for code in PRICE_CODES] for d in PRICE_DATES])
+
+# 报告日 -> 次日（验证日）
+NEXT_DATE = {
+    "2026-02-03": "2026-02-04",
+    "2026-02-04": "2026-02-05",
+    "2026-02-05": "2026-02-06",
+}
+
+# 信号文本 -> 方向代码（与 optimizer_kernel 的编码一致，未列出的信号按观望判断）
+SIGNAL_DIRECTION = {
+    '买入': SIGNAL_BUY, '强烈买入': SIGNAL_BUY, '加仓': SIGNAL_BUY,
+    '卖出': SIGNAL_SELL, '强烈卖出': SIGNAL_SELL, '减仓': SIGNAL_SELL,
+}
+
 # 原始LLM预测 (来自报告)
 ORIGINAL_PREDICTIONS = {
     "2026-02-03": {  # 报告在2/3晚生成，用于2/4操作
@@ -125,9 +149,20 @@ ORIGINAL_PREDICTIONS = {
 }
 
 
+@functools.cache
+def _get_optimizer() -> SignalOptimizer:
+    """
+    进程内共享的信号优化器（首次使用时创建）
+    
+    构造时要加载历史预测库和各子模块，按日期逐次新建代价远高于 optimize 本身；
+    本脚本的 context 不含缠论状态字段，optimize 不会修改优化器状态，可以复用
+    """
+    return SignalOptimizer()
+
+
 def apply_optimizer(date: str, predictions: dict) -> dict:
     """对预测应用优化器"""
-    optimizer = SignalOptimizer()
+    optimizer = _get_optimizer()
     optimized = {}
     
     for code, pred in predictions.items():
@@ -153,50 +188,60 @@ def apply_optimizer(date: str, predictions: dict) -> dict:
     return optimized
 
 
-def calculate_accuracy(predictions: dict, date: str) -> dict:
-    """计算预测准确率"""
+def _is_correct(direction: int, pct_change: float) -> bool:
+    """看多信号次日上涨、看空信号次日下跌、观望时小幅波动（|涨跌幅| < 3%）算对"""
+    if direction == SIGNAL_BUY:
+        return pct_change > 0
+    if direction == SIGNAL_SELL:
+        return pct_change < 0
+    return abs(pct_change) < 3
+
+
+def calculate_accuracy(predictions: dict, date: str, signal_key: str = 'signal') -> dict:
+    """
+    计算预测准确率
     
-    # 获取次日价格变化
-    next_dates = {
-        "2026-02-03": "2026-02-04",
-        "2026-02-04": "2026-02-05",
-        "2026-02-05": "2026-02-06",
-    }
+    Args:
+        predictions: {代码: 预测字典}
+        date: 报告日期
+        signal_key: 读取信号的键（原始预测为 'signal'，优化结果为 'optimized_signal'）
+    """
     
-    next_date = next_dates.get(date)
-    if not next_date:
+    # 获取次日价格变化（所有股票整行计算，任一日无价格时为 NaN）
+    next_date = NEXT_DATE.get(date)
+    if not next_date or date not in DATE_INDEX or next_date not in DATE_INDEX:
         return {}
     
+    price_today = PRICE_MATRIX[DATE_INDEX[date]]
+    price_next = PRICE_MATRIX[DATE_INDEX[next_date]]
+    pct_changes = (price_next - price_today) / price_today * 100
+    
     results = {}
     for code, pred in predictions.items():
-        if code not in PRICES:
-            continue
-        if date not in PRICES[code] or next_date not in PRICES[code]:
+        j = CODE_INDEX.get(code)
+        if j is None or np.isnan(pct_changes[j]):
             continue
+        pct_change = float(pct_changes[j])
         
-        price_today = PRICES[code][date]
-        price_next = PRICES[code][next_date]
-        pct_change = (price_next - price_today) / price_today * 100
-        
-        signal = pred.get('optimized_signal', pred.get('signal'))
-        
-        # 判断是否正确
-        if signal in ['买入', '强烈买入', '加仓']:
-            correct = pct_change > 0
-        elif signal in ['卖出', '强烈卖出', '减仓']:
-            correct = pct_change < 0
-        else:  # 观望
-            correct = abs(pct_change) < 3  # 观望时小幅波动算对
-        
+        signal = pred[signal_key]
         results[code] = {
             'signal': signal,
             'pct_change': pct_change,
-            'correct': correct,
+            'correct': _is_correct(SIGNAL_DIRECTION.get(signal, SIGNAL_HOLD), pct_change),
         }
     
     return results
 
 
+# 可验证的原始预测展开为 (报告日, 代码, 信号, 次日涨跌幅%, 是否正确) 元组，报告日或次日无价格的预测不计入。
+# 与优化后信号走同一个 calculate_accuracy（价格矩阵查找 + 方向判定），两侧口径不会分叉
+FLAT_PREDICTIONS = [
+    (date, code, result['signal'], result['pct_change'], result['correct'])
+    for date, preds in ORIGINAL_PREDICTIONS.items()
+    for code, result in calculate_accuracy(preds, date, 'signal').items()
+]
+
+
 def main():
     print("=" * 60)
     print("📊 信号优化器回测对比 (2026-02-03 ~ 2026-02-06)")
@@ -206,6 +251,12 @@ def main():
     total_optimized_correct = 0
     total_count = 0
     
+    # 原始预测的准确率取自展开后的元组
+    original_results = {
+        (date, code): {'signal': signal, 'pct_change': pct_change, 'correct': correct}
+        for date, code, signal, pct_change, correct in FLAT_PREDICTIONS
+    }
+    
     for date, preds in ORIGINAL_PREDICTIONS.items():
         print(f"\n{'=' * 60}")
         print(f"📅 {date} 预测 → 次日验证")
@@ -214,29 +265,13 @@ def main():
         # 应用优化器
         optimized = apply_optimizer(date, preds)
         
-        # 计算原始准确率
-        original_results = {}
-        for code, pred in preds.items():
-            if code in PRICES:
-                next_date = {"2026-02-03": "2026-02-04", "2026-02-04": "2026-02-05", "2026-02-05": "2026-02-06"}.get(date)
-                if next_date and date in PRICES[code] and next_date in PRICES[code]:
-                    pct_change = (PRICES[code][next_date] - PRICES[code][date]) / PRICES[code][date] * 100
-                    signal = pred['signal']
-                    if signal in ['买入', '强烈买入', '加仓']:
-                        correct = pct_change > 0
-                    elif signal in ['卖出', '强烈卖出', '减仓']:
-                        correct = pct_change < 0
-                    else:
-                        correct = abs(pct_change) < 3
-                    original_results[code] = {'signal': signal, 'pct_change': pct_change, 'correct': correct}
-        
         # 计算优化后准确率
-        optimized_preds = {code: {'optimized_signal': opt['optimized_signal']} for code, opt in optimized.items()}
-        optimized_results = calculate_accuracy(optimized_preds, date)
+        optimized_results = calculate_accuracy(optimized, date, 'optimized_signal')
         
-        # 显示对比
+        # 显示对比（逐股结果先收集，每个报告日整块写出一次）
+        out = []
         for code in preds:
-            orig = original_results.get(code, {})
+            orig = original_results.get((date, code), {})
             opt = optimized.get(code, {})
             opt_result = optimized_results.get(code, {})
             
@@ -264,11 +299,13 @@ def main():
             adjustments = opt.get('adjustments', [])
             adj_str = adjustments[0] if adjustments else ""
             
-            print(f"\n  {code}:")
-            print(f"    原始信号: {orig_signal:8} → 实际{pct_change:+.1f}% {orig_mark}")
-            print(f"    优化信号: {opt_signal:8} → 实际{pct_change:+.1f}% {opt_mark} {changed}")
+            out.append(f"\n  {code}:")
+            out.append(f"    原始信号: {orig_signal:8} → 实际{pct_change:+.1f}% {orig_mark}")
+            out.append(f"    优化信号: {opt_signal:8} → 实际{pct_change:+.1f}% {opt_mark} {changed}")
             if adj_str:
-                print(f"    调整原因: {adj_str}")
+                out.append(f"    调整原因: {adj_str}")
+        
+        sys.stdout.write("\n".join(out) + "\n")
     
     # 汇总
     print(f"\n{'=' * 60}")
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - JSON 定位内核
+===================================
+
+职责：
+1. 单次扫描定位 LLM 响应中首个括号配平的 {...} 对象（跳过字符串内的括号，
+   正文里的 "}" 不再干扰截取边界）
+2. 同一次扫描中标记字符串外出现的注释、尾随逗号和 Python 布尔值，
+   修复阶段只执行确有需要的替换
+
+扫描在 UTF-8 字节上进行（括号、引号等均为 ASCII，字节偏移即可安全切片）。
+未安装 numba 时退回「首个 "{" 到最后一个 "}"」的截取方式，并启用全部修复项。
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from numba_compat import NUMBA_AVAILABLE, njit
+
+# 修复项标记位
+FIX_LINE_COMMENT = 1
+FIX_BLOCK_COMMENT = 2
+FIX_TRAILING_COMMA = 4
+FIX_PYTHON_BOOL = 8
+FIX_ALL = FIX_LINE_COMMENT | FIX_BLOCK_COMMENT | FIX_TRAILING_COMMA | FIX_PYTHON_BOOL
+
+
+@njit(cache=True)
+def _matches(buf, pos, word):
+    """buf[pos:] 是否以 word 开头"""
+    if pos + word.shape[0] > buf.shape[0]:
+        return False
+    for k in range(word.shape[0]):
+        if buf[pos + k] != word[k]:
+            return False
+    return True
+
+
+_TRUE = np.frombuffer(b'True', dtype=np.uint8)
+_FALSE = np.frombuffer(b'False', dtype=np.uint8)
+
+
+@njit(cache=True)
+def _scan_json_span(buf, true_word, false_word):
+    """
+    返回 (start, end, flags)：end 为开区间；未找到 "{" 时 start=-1，对象未闭合时 end=-1
+    """
+    n = buf.shape[0]
+    start = -1
+    for i in range(n):
+        if buf[i] == 123:  # {
+            start = i
+            break
+    if start < 0:
+        return -1, -1, 0
+
+    depth = 0
+    flags = 0
+    in_string = False
+    escape = False
+    i = start
+    while i < n:
+        c = buf[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif c == 92:  # \
+                escape = True
+            elif c == 34:  # "
+                in_string = False
+        elif c == 34:
+            in_string = True
+        elif c == 123:
+            depth += 1
+        elif c == 125:  # }
+            depth -= 1
+            if depth == 0:
+                return start, i + 1, flags
+        elif c == 47 and i + 1 < n:  # /
+            nxt = buf[i + 1]
+            if nxt == 47:  # 行注释：跳到行尾
+                flags |= FIX_LINE_COMMENT
+                i += 2
+                while i < n and buf[i] != 10:
+                    i += 1
+                continue
+            if nxt == 42:  # 块注释：跳到 */ 之后
+                flags |= FIX_BLOCK_COMMENT
+                i += 2
+                while i + 1 < n and not (buf[i] == 42 and buf[i + 1] == 47):
+                    i += 1
+                i += 2
+                continue
+        elif c == 44:  # ,
+            j = i + 1
+            while j < n and (buf[j] == 32 or buf[j] == 10 or buf[j] == 13 or buf[j] == 9):
+                j += 1
+            if j < n and (buf[j] == 125 or buf[j] == 93):
+                flags |= FIX_TRAILING_COMMA
+        elif c == 84:  # T
+            if _matches(buf, i, true_word):
+                flags |= FIX_PYTHON_BOOL
+        elif c == 70:  # F
+            if _matches(buf, i, false_word):
+                flags |= FIX_PYTHON_BOOL
+        i += 1
+    return start, -1, flags
+
+
+def find_json_span(text: str) -> Tuple[Optional[str], int]:
+    """
+    定位响应中的 JSON 对象
+
+    Returns:
+        (JSON 子串, 修复标记)；未找到对象时子串为 None
+    """
+    if not NUMBA_AVAILABLE:
+        start = text.find('{')
+        end = text.rfind('}')
+        if start < 0 or end < start:
+            return None, FIX_ALL
+        return text[start:end + 1], FIX_ALL
+
+    raw = text.encode('utf-8')
+    start, end, flags = _scan_json_span(np.frombuffer(raw, dtype=np.uint8), _TRUE, _FALSE)
+    if start < 0:
+        return None, 0
+    if end < 0:
+        # 对象未闭合（输出被截断或括号不配对）：沿用首个 "{" 到最后一个 "}" 的截取方式，
+        # 此时字符串边界可能已错位，启用全部修复项
+        end = raw.rfind(b'}') + 1
+        if end <= start:
+            return None, FIX_ALL
+        flags = FIX_ALL
+    return raw[start:end].decode('utf-8'), flags
+
+
+__all__ = [
+    'FIX_LINE_COMMENT', 'FIX_BLOCK_COMMENT', 'FIX_TRAILING_COMMA', 'FIX_PYTHON_BOOL', 'FIX_ALL',
+    'find_json_span',
+]
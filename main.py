@@ -358,8 +358,11 @@ class StockAnalysisPipeline:
                 logger.warning(f"[{code}] 趋势分析失败: {e}")
             
             # Step 4: 多维度情报搜索（最新消息+风险排查+业绩预期）
+            # AI 分析不可用时搜索结果无处使用，跳过以节省搜索配额
             news_context = None
-            if self.search_service.is_available:
+            if not self.analyzer.is_available():
+                logger.info(f"[{code}] AI 分析不可用，跳过情报搜索")
+            elif self.search_service.is_available:
                 logger.info(f"[{code}] 开始多维度情报搜索...")
                 
                 # 使用多维度搜索（最多3次搜索）
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - Numba 兼容层
+===================================
+
+职责：
+1. 统一导入 numba 的 njit / prange（可选依赖）
+2. 未安装 numba 时提供同名的空装饰器，被装饰函数按普通 Python 执行，
+   调用方可根据 NUMBA_AVAILABLE 决定是否走 JIT 路径
+"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - 取决于运行环境
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """numba.njit 的空实现：支持 @njit 和 @njit(...) 两种写法"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+
+__all__ = ['NUMBA_AVAILABLE', 'njit', 'prange']
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+信号优化器 - 硬规则数值内核
+===================================
+
+职责：
+1. 以 numba 编译的循环批量判定 HardRuleFilter 的硬规则（禁买/禁卖/警告）
+2. 信号按方向编码为 int8（0=买入类, 1=中性, 2=卖出类），避免在 JIT 代码中处理字符串
+
+规则顺序必须与 signal_optimizer.HardRuleFilter 中的
+NO_BUY_RULES / NO_SELL_RULES / WARNING_RULES 保持一致（导入时校验条数）；
+阈值不在内核中写死，由调用方按 THRESHOLD_KEYS 的顺序以数组传入
+（取自 signal_optimizer.HARD_RULE_THRESHOLDS，与逐只判定共用同一份取值）。
+未安装 numba 时由调用方改用 NumPy 向量化判定。
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from numba_compat import NUMBA_AVAILABLE, njit, prange
+
+SIGNAL_BUY = 0
+SIGNAL_HOLD = 1
+SIGNAL_SELL = 2
+
+_BUY_SIGNALS = frozenset(('买入', '强烈买入', '加仓'))
+_SELL_SIGNALS = frozenset(('卖出', '强烈卖出', '减仓'))
+
+# 各组规则条数（与 HardRuleFilter 的规则表一一对应）
+N_NO_BUY_RULES = 6
+N_NO_SELL_RULES = 4
+N_WARNING_RULES = 3
+
+# 阈值数组各位置对应的阈值名（hard_rule_kernel 按下列下标读取）
+THRESHOLD_KEYS = (
+    'no_buy_bias_ma5', 'no_buy_pct_chg', 'no_buy_up_days', 'no_buy_rsi',
+    'no_buy_volume_ratio', 'no_buy_flat_pct_chg',
+    'no_sell_bias_ma5', 'no_sell_down_days', 'no_sell_rsi',
+    'warn_bias_ma5_low', 'warn_bias_ma5_high', 'warn_volume_ratio', 'warn_reduction_pct',
+)
+(
+    _T_NO_BUY_BIAS, _T_NO_BUY_PCT, _T_NO_BUY_UP_DAYS, _T_NO_BUY_RSI,
+    _T_NO_BUY_VOL, _T_NO_BUY_FLAT_PCT,
+    _T_NO_SELL_BIAS, _T_NO_SELL_DOWN_DAYS, _T_NO_SELL_RSI,
+    _T_WARN_BIAS_LOW, _T_WARN_BIAS_HIGH, _T_WARN_VOL, _T_WARN_REDUCTION,
+) = range(len(THRESHOLD_KEYS))
+
+
+def encode_signals(signals: List[str]) -> np.ndarray:
+    """将信号文本编码为方向代码数组"""
+    return np.array(
+        [SIGNAL_BUY if s in _BUY_SIGNALS else (SIGNAL_SELL if s in _SELL_SIGNALS else SIGNAL_HOLD)
+         for s in signals],
+        dtype=np.int8,
+    )
+
+
+@njit(cache=True, parallel=True)
+def hard_rule_kernel(
+    signal_codes, bias_ma5, pct_chg, rsi, volume_ratio,
+    up_days, down_days, prev_limit_up, prev_limit_down,
+    has_reduction_plan, reduction_pct, has_strong_positive, thresholds,
+):
+    """
+    逐只股票判定硬规则命中情况
+    
+    数值参数为 float64 数组（缺失值为 NaN，比较结果为 False），标志参数为 bool 数组，
+    thresholds 为按 THRESHOLD_KEYS 顺序排列的 float64 阈值数组。
+    
+    Returns:
+        (no_buy_hits[n, 6], no_sell_hits[n, 4], warning_hits[n, 3])，均为 bool 矩阵；
+        仅对信号方向适用的规则置位
+    """
+    n = signal_codes.shape[0]
+    no_buy = np.zeros((n, 6), dtype=np.bool_)
+    no_sell = np.zeros((n, 4), dtype=np.bool_)
+    warn = np.zeros((n, 3), dtype=np.bool_)
+    t = thresholds
+    for i in prange(n):
+        if signal_codes[i] == 0:
+            no_buy[i, 0] = bias_ma5[i] > t[_T_NO_BUY_BIAS]
+            no_buy[i, 1] = pct_chg[i] >= t[_T_NO_BUY_PCT]
+            no_buy[i, 2] = up_days[i] >= t[_T_NO_BUY_UP_DAYS]
+            no_buy[i, 3] = prev_limit_up[i]
+            no_buy[i, 4] = rsi[i] > t[_T_NO_BUY_RSI]
+            no_buy[i, 5] = volume_ratio[i] > t[_T_NO_BUY_VOL] and abs(pct_chg[i]) < t[_T_NO_BUY_FLAT_PCT]
+            warn[i, 0] = bias_ma5[i] > t[_T_WARN_BIAS_LOW] and bias_ma5[i] <= t[_T_WARN_BIAS_HIGH]
+            warn[i, 1] = pct_chg[i] > 0 and volume_ratio[i] < t[_T_WARN_VOL]
+            warn[i, 2] = (
+                has_reduction_plan[i] and reduction_pct[i] > t[_T_WARN_REDUCTION] and not has_strong_positive[i]
+            )
+        elif signal_codes[i] == 2:
+            no_sell[i, 0] = bias_ma5[i] < t[_T_NO_SELL_BIAS]
+            no_sell[i, 1] = down_days[i] >= t[_T_NO_SELL_DOWN_DAYS]
+            no_sell[i, 2] = prev_limit_down[i]
+            no_sell[i, 3] = rsi[i] < t[_T_NO_SELL_RSI]
+    return no_buy, no_sell, warn
+
+
+def evaluate_hard_rules(
+    signals: List[str], columns: dict, thresholds: dict
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    用 JIT 内核判定硬规则
+    
+    Args:
+        signals: 信号文本列表
+        columns: HardRuleFilter.check_batch 构建的指标列（SoA）
+        thresholds: 阈值名 -> 取值（signal_optimizer.HARD_RULE_THRESHOLDS）
+    """
+    return hard_rule_kernel(
+        encode_signals(signals),
+        columns['bias_ma5'], columns['pct_chg'], columns['rsi'], columns['volume_ratio'],
+        columns['consecutive_up_days'], columns['consecutive_down_days'],
+        columns['prev_limit_up'], columns['prev_limit_down'],
+        columns['has_reduction_plan'], columns['reduction_pct'], columns['has_strong_positive'],
+        np.array([thresholds[key] for key in THRESHOLD_KEYS], dtype=np.float64),
+    )
+
+
+__all__ = [
+    'NUMBA_AVAILABLE', 'SIGNAL_BUY', 'SIGNAL_HOLD', 'SIGNAL_SELL',
+    'N_NO_BUY_RULES', 'N_NO_SELL_RULES', 'N_WARNING_RULES', 'THRESHOLD_KEYS',
+    'encode_signals', 'hard_rule_kernel', 'evaluate_hard_rules',
+]
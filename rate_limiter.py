@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 限流器
+===================================
+
+职责：
+1. 提供线程安全的令牌桶限流器
+2. 多个工作线程共享同一个令牌桶，按配额并发发起请求，
+   取代"每次请求前固定 sleep"的串行等待方式
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    令牌桶限流器（线程安全）
+
+    - 令牌按 rate_per_minute 匀速补充，桶容量为 capacity
+    - acquire() 取走一个令牌，令牌不足时阻塞到补充足够为止
+    - rate_per_minute <= 0 表示不限流
+
+    使用方式：
+        bucket = TokenBucket(rate_per_minute=30, capacity=3)
+        bucket.acquire()  # 发起请求前调用
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int = 1):
+        """
+        Args:
+            rate_per_minute: 每分钟补充的令牌数（即每分钟最大请求数）
+            capacity: 桶容量，即允许的最大突发请求数
+        """
+        self._rate = rate_per_minute / 60.0  # 每秒补充的令牌数
+        self._capacity = max(1, int(capacity))
+        self._tokens = float(self._capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate_per_minute(self) -> float:
+        return self._rate * 60.0
+
+    def _refill(self, now: float) -> None:
+        """按流逝时间补充令牌（调用方需持有锁）"""
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+            self._last_refill = now
+
+    def try_acquire(self) -> bool:
+        """尝试获取一个令牌，不阻塞"""
+        if self._rate <= 0:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self) -> float:
+        """
+        获取一个令牌，令牌不足时阻塞等待
+
+        Returns:
+            实际等待的秒数
+        """
+        if self._rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait_time = (1 - self._tokens) / self._rate
+            # 在锁外休眠，不阻塞其他线程补充/获取令牌
+            time.sleep(wait_time)
+            waited += wait_time
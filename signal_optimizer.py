@@ -15,14 +15,23 @@ Created: 2026-02-07
 Author: 牧牧 for Karl
 """
 
+import atexit
 import json
 import logging
+import numbers
+import queue
 import sqlite3
+import threading
+import time
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, Dict, Any, List, Tuple
 
+import numpy as np
+
+import optimizer_kernel
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,6 +47,26 @@ class HardRuleResult:
     warnings: List[str] = field(default_factory=list)  # 警告信息
 
 
+# 硬规则阈值：规则表的 condition / vector_condition 与 JIT 内核（optimizer_kernel）共用同一份取值，
+# 修改阈值时两条判定路径同步生效
+HARD_RULE_THRESHOLDS = {
+    'no_buy_bias_ma5': 5,         # 乖离率过高
+    'no_buy_pct_chg': 7,          # 当日大涨追高
+    'no_buy_up_days': 4,          # 连续大涨
+    'no_buy_rsi': 80,             # RSI超买
+    'no_buy_volume_ratio': 2,     # 放量滞涨：量比下限
+    'no_buy_flat_pct_chg': 1,     # 放量滞涨：涨跌幅绝对值上限
+    'no_sell_bias_ma5': -5,       # 乖离率过低
+    'no_sell_down_days': 4,       # 连续大跌
+    'no_sell_rsi': 20,            # RSI超卖
+    'warn_bias_ma5_low': 3,       # 乖离率偏高区间 (low, high]
+    'warn_bias_ma5_high': 5,
+    'warn_volume_ratio': 0.7,     # 量价背离：量比上限
+    'warn_reduction_pct': 5,      # 大股东减持比例
+}
+_T = HARD_RULE_THRESHOLDS
+
+
 class HardRuleFilter:
     """
     硬规则过滤器
@@ -49,17 +78,17 @@ class HardRuleFilter:
     NO_BUY_RULES = [
         {
             'name': '乖离率过高',
-            'condition': lambda d: d.get('bias_ma5', 0) > 5,
+            'condition': lambda d: d.get('bias_ma5', 0) > _T['no_buy_bias_ma5'],
             'message': '乖离率 {bias_ma5:.1f}% > 5%，追高风险',
         },
         {
             'name': '当日大涨追高',
-            'condition': lambda d: d.get('pct_chg', 0) >= 7,
+            'condition': lambda d: d.get('pct_chg', 0) >= _T['no_buy_pct_chg'],
             'message': '当日涨幅 {pct_chg:.1f}%，次日追高风险极大',
         },
         {
             'name': '连续大涨',
-            'condition': lambda d: d.get('consecutive_up_days', 0) >= 4,
+            'condition': lambda d: d.get('consecutive_up_days', 0) >= _T['no_buy_up_days'],
             'message': '连涨 {consecutive_up_days} 日，回调风险',
         },
         {
@@ -69,14 +98,17 @@ class HardRuleFilter:
         },
         {
             'name': 'RSI超买',
-            'condition': lambda d: d.get('rsi', 50) > 80,
+            'condition': lambda d: d.get('rsi', 50) > _T['no_buy_rsi'],
             'message': 'RSI={rsi:.0f} 超买区',
         },
         {
             'name': '放量滞涨',
             'condition': lambda d: (
-                d.get('volume_ratio', 1) > 2 and 
-                abs(d.get('pct_chg', 0)) < 1
+                d.get('volume_ratio', 1) > _T['no_buy_volume_ratio'] and 
+                abs(d.get('pct_chg', 0)) < _T['no_buy_flat_pct_chg']
+            ),
+            'vector_condition': lambda d: (
+                (d['volume_ratio'] > _T['no_buy_volume_ratio']) & (np.abs(d['pct_chg']) < _T['no_buy_flat_pct_chg'])
             ),
             'message': '放量滞涨，主力出货嫌疑',
         },
@@ -86,12 +118,12 @@ class HardRuleFilter:
     NO_SELL_RULES = [
         {
             'name': '乖离率过低',
-            'condition': lambda d: d.get('bias_ma5', 0) < -5,
+            'condition': lambda d: d.get('bias_ma5', 0) < _T['no_sell_bias_ma5'],
             'message': '乖离率 {bias_ma5:.1f}% < -5%，超跌反弹概率大',
         },
         {
             'name': '连续大跌',
-            'condition': lambda d: d.get('consecutive_down_days', 0) >= 4,
+            'condition': lambda d: d.get('consecutive_down_days', 0) >= _T['no_sell_down_days'],
             'message': '连跌 {consecutive_down_days} 日，反弹概率增加',
         },
         {
@@ -101,7 +133,7 @@ class HardRuleFilter:
         },
         {
             'name': 'RSI超卖',
-            'condition': lambda d: d.get('rsi', 50) < 20,
+            'condition': lambda d: d.get('rsi', 50) < _T['no_sell_rsi'],
             'message': 'RSI={rsi:.0f} 超卖区',
         },
     ]
@@ -110,7 +142,10 @@ class HardRuleFilter:
     WARNING_RULES = [
         {
             'name': '乖离率偏高',
-            'condition': lambda d: 3 < d.get('bias_ma5', 0) <= 5,
+            'condition': lambda d: _T['warn_bias_ma5_low'] < d.get('bias_ma5', 0) <= _T['warn_bias_ma5_high'],
+            'vector_condition': lambda d: (
+                (d['bias_ma5'] > _T['warn_bias_ma5_low']) & (d['bias_ma5'] <= _T['warn_bias_ma5_high'])
+            ),
             'message': '⚠️ 乖离率 {bias_ma5:.1f}%，注意回调风险',
             'applies_to': ['买入', '强烈买入', '加仓'],
         },
@@ -118,8 +153,9 @@ class HardRuleFilter:
             'name': '量价背离',
             'condition': lambda d: (
                 d.get('pct_chg', 0) > 0 and 
-                d.get('volume_ratio', 1) < 0.7
+                d.get('volume_ratio', 1) < _T['warn_volume_ratio']
             ),
+            'vector_condition': lambda d: (d['pct_chg'] > 0) & (d['volume_ratio'] < _T['warn_volume_ratio']),
             'message': '⚠️ 缩量上涨，后继乏力',
             'applies_to': ['买入', '强烈买入', '加仓'],
         },
@@ -129,9 +165,12 @@ class HardRuleFilter:
             # 仅当减持比例>5%且无强利好对冲时才警告
             'condition': lambda d: (
                 d.get('has_reduction_plan', False) and 
-                d.get('reduction_pct', 100) > 5 and
+                d.get('reduction_pct', 100) > _T['warn_reduction_pct'] and
                 not d.get('has_strong_positive', False)
             ),
+            'vector_condition': lambda d: (
+                d['has_reduction_plan'] & (d['reduction_pct'] > _T['warn_reduction_pct']) & ~d['has_strong_positive']
+            ),
             'message': '⚠️ 大股东减持>5%且无强利好对冲',
             'applies_to': ['买入', '强烈买入', '加仓'],
         },
@@ -192,6 +231,118 @@ class HardRuleFilter:
             logger.info(f"硬规则过滤: {signal} → {result.adjusted_signal}, 原因: {result.blocked_reasons}")
         
         return result
+    
+    # 批量判定时各指标列的缺省值（与单只规则中 d.get 的缺省值一致）
+    NUMERIC_DEFAULTS = {
+        'bias_ma5': 0, 'pct_chg': 0, 'rsi': 50, 'volume_ratio': 1,
+        'consecutive_up_days': 0, 'consecutive_down_days': 0, 'reduction_pct': 100,
+    }
+    FLAG_DEFAULTS = {
+        'prev_limit_up': False, 'prev_limit_down': False,
+        'has_reduction_plan': False, 'has_strong_positive': False,
+    }
+    
+    @staticmethod
+    def _to_float(value: Any) -> float:
+        """指标值转为 float；None/非数值转为 NaN，与单只判定时比较出错跳过该规则的效果一致"""
+        if isinstance(value, numbers.Real):
+            return float(value)
+        return float('nan')
+    
+    def check_batch(
+        self, 
+        signals: List[str], 
+        indicators_list: List[Dict[str, Any]]
+    ) -> List[HardRuleResult]:
+        """
+        批量检查硬规则
+        
+        将各只股票的指标转为按列存储的 NumPy 数组（SoA），每条规则对全部股票
+        只做一次向量化判定；仅对命中的股票格式化原因文本。
+        结果与逐只调用 check() 一致，向量化判定出错时回退到逐只检查。
+        
+        Args:
+            signals: 各只股票的 LLM 信号
+            indicators_list: 各只股票的技术指标，与 signals 一一对应
+            
+        Returns:
+            HardRuleResult 列表
+        """
+        try:
+            columns: Dict[str, np.ndarray] = {}
+            for key, default in self.NUMERIC_DEFAULTS.items():
+                columns[key] = np.array(
+                    [self._to_float(d.get(key, default)) for d in indicators_list], dtype=np.float64
+                )
+            for key, default in self.FLAG_DEFAULTS.items():
+                columns[key] = np.array([bool(d.get(key, default)) for d in indicators_list], dtype=bool)
+            
+            if optimizer_kernel.NUMBA_AVAILABLE:
+                # JIT 内核：一次循环判定全部规则，返回 [股票, 规则] 命中矩阵
+                no_buy_hits, no_sell_hits, warning_hits = optimizer_kernel.evaluate_hard_rules(
+                    signals, columns, HARD_RULE_THRESHOLDS
+                )
+                blocking = [(rule, '禁买', no_buy_hits[:, j]) for j, rule in enumerate(self.NO_BUY_RULES)]
+                blocking += [(rule, '禁卖', no_sell_hits[:, j]) for j, rule in enumerate(self.NO_SELL_RULES)]
+                warning = [(rule, warning_hits[:, j]) for j, rule in enumerate(self.WARNING_RULES)]
+            else:
+                signal_arr = np.array(signals, dtype=object)
+                buy_mask = np.isin(signal_arr, ['买入', '强烈买入', '加仓'])
+                sell_mask = np.isin(signal_arr, ['卖出', '强烈卖出', '减仓'])
+                
+                # (规则, 适用股票掩码, 命中掩码)
+                with np.errstate(invalid='ignore'):
+                    blocking = [
+                        (rule, tag, applies & rule.get('vector_condition', rule['condition'])(columns))
+                        for rules, tag, applies in (
+                            (self.NO_BUY_RULES, '禁买', buy_mask),
+                            (self.NO_SELL_RULES, '禁卖', sell_mask),
+                        )
+                        for rule in rules
+                    ]
+                    warning = [
+                        (rule, np.isin(signal_arr, rule.get('applies_to', []))
+                         & rule.get('vector_condition', rule['condition'])(columns))
+                        for rule in self.WARNING_RULES
+                    ]
+        except Exception as e:
+            logger.warning(f"硬规则批量判定失败，逐只检查: {e}")
+            return [self.check(s, d) for s, d in zip(signals, indicators_list)]
+        
+        results = [
+            HardRuleResult(passed=True, original_signal=s, adjusted_signal=s) for s in signals
+        ]
+        for rule, tag, hit in blocking:
+            for i in np.flatnonzero(hit):
+                result = results[i]
+                result.passed = False
+                result.adjusted_signal = '观望'
+                try:
+                    reason = rule['message'].format(**indicators_list[i])
+                    result.blocked_reasons.append(f"[{tag}] {rule['name']}: {reason}")
+                except Exception as e:
+                    logger.warning(f"规则检查异常 {rule['name']}: {e}")
+        for rule, hit in warning:
+            for i in np.flatnonzero(hit):
+                try:
+                    results[i].warnings.append(rule['message'].format(**indicators_list[i]))
+                except Exception:
+                    pass
+        
+        for result in results:
+            if result.blocked_reasons:
+                logger.info(f"硬规则过滤: {result.original_signal} → {result.adjusted_signal}, 原因: {result.blocked_reasons}")
+        
+        return results
+
+
+# JIT 内核按固定顺序实现上述规则，规则表增删时需同步修改 optimizer_kernel；阈值由调用方传入
+assert (
+    len(HardRuleFilter.NO_BUY_RULES) == optimizer_kernel.N_NO_BUY_RULES
+    and len(HardRuleFilter.NO_SELL_RULES) == optimizer_kernel.N_NO_SELL_RULES
+    and len(HardRuleFilter.WARNING_RULES) == optimizer_kernel.N_WARNING_RULES
+    and set(HARD_RULE_THRESHOLDS) == set(optimizer_kernel.THRESHOLD_KEYS)
+), "HardRuleFilter 规则表与 optimizer_kernel 不一致"
 
 
 # ========== P0: 反转预警 ==========
@@ -498,14 +649,30 @@ class PredictionHistoryManager:
     预测历史管理器
     
     记录每次预测及结果，用于统计准确率和优化
+    
+    预测记录采用后写队列：log_prediction 只入队，后台写线程在
+    FLUSH_WINDOW 秒内合并到达的记录，以单个事务 executemany 写入；
+    flush() 等待队列写完（批量分析结束和进程退出时调用）
     """
     
+    FLUSH_WINDOW = 1.0  # 合并写入的等待窗口（秒）
+    MAX_BATCH_ROWS = 500  # 单个事务最多写入的记录数
+    
+    _INSERT_PREDICTION_SQL = '''
+        INSERT OR REPLACE INTO predictions 
+        (date, code, name, signal, confidence, price_at_signal, target_price, stop_loss)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
     def __init__(self, db_path: str = None):
         if db_path is None:
             db_path = Path(__file__).parent / 'data' / 'predictions.db'
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._init_db()
+        self._pending: 'queue.Queue[tuple]' = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
     
     def _init_db(self):
         """初始化数据库"""
@@ -566,22 +733,66 @@ class PredictionHistoryManager:
         target: float = None,
         stop_loss: float = None
     ):
-        """记录预测"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """记录预测（入队，由后台写线程批量写入）"""
+        self._pending.put((date, code, name, signal, confidence, price, target, stop_loss))
+        if self._writer is None:
+            self._start_writer()
+    
+    def log_predictions(self, rows: List[tuple]):
+        """
+        批量记录预测（单个事务）
         
+        Args:
+            rows: (date, code, name, signal, confidence, price, target, stop_loss) 元组列表
+        """
+        conn = None
         try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO predictions 
-                (date, code, name, signal, confidence, price_at_signal, target_price, stop_loss)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (date, code, name, signal, confidence, price, target, stop_loss))
-            conn.commit()
-            logger.debug(f"记录预测: {date} {code} {signal}")
+            # 连接也放在 try 内：数据库目录被删除等情况下 connect 本身会失败
+            conn = sqlite3.connect(self.db_path)
+            with conn:
+                conn.executemany(self._INSERT_PREDICTION_SQL, rows)
+            logger.debug(f"记录预测: {len(rows)} 条")
         except Exception as e:
             logger.error(f"记录预测失败: {e}")
         finally:
-            conn.close()
+            if conn is not None:
+                conn.close()
+    
+    def flush(self):
+        """等待已入队的预测全部写入"""
+        if self._writer is not None:
+            self._pending.join()
+    
+    def _start_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._writer_loop, name='prediction-writer', daemon=True
+                )
+                self._writer.start()
+                atexit.register(self.flush)
+    
+    def _writer_loop(self):
+        pending = self._pending
+        while True:
+            rows = [pending.get()]
+            # 任何异常都不能让写线程退出：已取出的行必须 task_done，否则 flush() 永远阻塞
+            try:
+                deadline = time.monotonic() + self.FLUSH_WINDOW
+                while len(rows) < self.MAX_BATCH_ROWS:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        rows.append(pending.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                self.log_predictions(rows)
+            except Exception as e:
+                logger.error(f"预测写线程处理失败: {e}")
+            finally:
+                for _ in rows:
+                    pending.task_done()
     
     def log_result(
         self, 
@@ -1299,7 +1510,8 @@ class SignalOptimizer:
         confidence: float,
         indicators: Dict[str, Any],
         stock_info: Dict[str, Any],
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        hard_rule_result: Optional[HardRuleResult] = None
     ) -> Dict[str, Any]:
         """
         优化信号
@@ -1310,6 +1522,7 @@ class SignalOptimizer:
             indicators: 技术指标
             stock_info: 股票基本信息
             context: 上下文信息
+            hard_rule_result: 预先计算的硬规则结果（批量优化时传入，None 时现场检查）
             
         Returns:
             优化结果字典
@@ -1333,7 +1546,8 @@ class SignalOptimizer:
             return result
         
         # 2. 硬规则过滤
-        hard_rule_result = self.hard_rule_filter.check(signal, indicators)
+        if hard_rule_result is None:
+            hard_rule_result = self.hard_rule_filter.check(signal, indicators)
         if not hard_rule_result.passed:
             result['final_signal'] = hard_rule_result.adjusted_signal
             result['blocked'] = True
@@ -1424,14 +1638,43 @@ class SignalOptimizer:
         
         return result
     
+    def optimize_batch(
+        self,
+        signals: List[str],
+        confidences: List[float],
+        indicators_list: List[Dict[str, Any]],
+        stock_infos: List[Dict[str, Any]],
+        contexts: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        批量优化信号
+        
+        硬规则对全部股票一次性向量化判定（HardRuleFilter.check_batch），
+        其余步骤逐只执行，结果与逐只调用 optimize() 一致
+        
+        Returns:
+            优化结果字典列表，与输入一一对应
+        """
+        hard_rule_results = self.hard_rule_filter.check_batch(signals, indicators_list)
+        return [
+            self.optimize(signal, confidence, indicators, stock_info, context, hard_rule_result)
+            for signal, confidence, indicators, stock_info, context, hard_rule_result in zip(
+                signals, confidences, indicators_list, stock_infos, contexts, hard_rule_results
+            )
+        ]
+    
     def log_prediction(self, date: str, code: str, name: str, signal: str, 
                        confidence: float, price: float, target: float = None, 
                        stop_loss: float = None):
-        """记录预测到历史库"""
+        """记录预测到历史库（后写队列，批量提交）"""
         self.history_manager.log_prediction(
             date, code, name, signal, confidence, price, target, stop_loss
         )
     
+    def flush_predictions(self):
+        """等待排队中的预测记录写入历史库"""
+        self.history_manager.flush()
+    
     def log_result(self, pred_date: str, code: str, result_date: str, 
                    actual_price: float, notes: str = None):
         """记录实际结果"""